@@ -1,5 +1,22 @@
+import hashlib
+import json
+import mmap
+import platform
+import os
+import sqlite3
 import struct
-from PIL import Image
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+import numpy as np
+from PIL import Image, GifImagePlugin
 
 # ==============================================================================
 # 1. CLASSES DE ESTRUTURA DE DADOS
@@ -11,7 +28,8 @@ class BSprite:
         self.version = 0
         self.flags = 0
         
-        self.palettes = []      # Lista de Paletas (Lista de [R, G, B, A] cores)
+        self.palettes = []      # Lista de Paletas (arrays uint8 [n_cores, 4] em R, G, B, A)
+        self.color_format = 0x8888 # Formato das cores no arquivo (8888, 4444, 1555, 0565)
         self.modules = []       # Lista de Módulos (Largura, Altura)
         self.fmodules = []      # Lista de FModules (Módulo Index, Offset X, Offset Y, Flags)
         self.frames = []        # Lista de Frames (Contagem FModules, Índice Início FModule, Bounding Box)
@@ -19,8 +37,83 @@ class BSprite:
         self.anims = []         # Lista de Anims (Contagem AFrames, Índice Início AFrame)
         
         self.modules_data = None # Dados de pixel binários codificados
+        self.module_offsets = array('I', [0]) # Início de cada módulo em modules_data (+ fim)
+        self.edited_modules = {} # Módulos repintados: índice -> array de índices de paleta
         self.data_format = 0     # I2, I4, I256, I127RLE, etc.
 
+        # Módulos já decodificados e transformados, chave (módulo, paleta, flags)
+        self.module_cache = ModuleCache()
+
+        self._mmap = None        # Mapeamento do arquivo no modo lazy
+
+    def module_data(self, module_index):
+        """Bytes codificados do módulo, como memoryview (sem cópia), em O(1)."""
+        start = self.module_offsets[module_index]
+        end = self.module_offsets[module_index + 1]
+        return memoryview(self.modules_data)[start:end]
+
+    def close(self):
+        """Libera o mapeamento do arquivo (apenas sprites carregados com lazy=True)."""
+        if self._mmap is None:
+            return
+        self.module_cache.clear()
+        self.modules_data = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Ainda há views do mapeamento em uso; o GC fecha quando forem liberadas
+            pass
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ModuleCache:
+    """
+    Cache LRU limitado de módulos decodificados.
+    A chave é (índice do módulo, índice da paleta, flags de flip/rotação).
+    """
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
 class FrameInfo:
     def __init__(self, fmodule_count, fmodule_start_index, bounds_rect=None):
         self.fmodule_count = fmodule_count
@@ -33,246 +126,638 @@ class AnimInfo:
         self.aframe_start_index = aframe_start_index
 
 # ==============================================================================
-# 2. FUNÇÕES DE LEITURA BINÁRIA (LITTLE-ENDIAN)
-#    Emulação da leitura byte-a-byte do Java
+# 2. LEITURA BINÁRIA (LITTLE-ENDIAN)
+#    O arquivo é lido uma única vez; campos soltos saem com struct.unpack_from
+#    e cada tabela inteira é decodificada de uma vez com numpy.frombuffer.
 # ==============================================================================
 
-def read_byte(f):
-    """Lê 1 byte como um inteiro sem sinal (0-255)"""
-    return struct.unpack('<B', f.read(1))[0]
+# Registros das tabelas do BSprite (sem alinhamento, como no arquivo)
+MODULE_DTYPE = np.dtype([('width', 'u1'), ('height', 'u1')])
+FMODULE_DTYPE = np.dtype([('module', 'u1'), ('offset_x', 'u1'), ('offset_y', 'u1'), ('flags', 'u1')])
+FRAME_DTYPE = np.dtype([('fmodule_count', 'u1'), ('fmodule_start', '<u2'),
+                        ('x', 'u1'), ('y', 'u1'), ('w', 'u1'), ('h', 'u1')])
+AFRAME_DTYPE = np.dtype([('frame', 'u1'), ('duration', 'u1'), ('offset_x', 'u1'),
+                         ('offset_y', 'u1'), ('flags', 'u1')])
+
+class BufferReader:
+    """Leitura sequencial sobre um buffer já carregado na memória."""
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def read_byte(self):
+        """Lê 1 byte como um inteiro sem sinal (0-255)"""
+        value = struct.unpack_from('<B', self.data, self.pos)[0]
+        self.pos += 1
+        return value
+
+    def read_short(self):
+        """Lê 2 bytes como um inteiro de 16 bits sem sinal (Little-Endian)"""
+        value = struct.unpack_from('<H', self.data, self.pos)[0]
+        self.pos += 2
+        return value
 
-def read_short(f):
-    """Lê 2 bytes como um inteiro de 16 bits sem sinal (Little-Endian)"""
-    return struct.unpack('<H', f.read(2))[0]
+    def read_int(self):
+        """Lê 4 bytes como um inteiro de 32 bits sem sinal (Little-Endian)"""
+        value = struct.unpack_from('<I', self.data, self.pos)[0]
+        self.pos += 4
+        return value
 
-def read_int(f):
-    """Lê 4 bytes como um inteiro de 32 bits sem sinal (Little-Endian)"""
-    return struct.unpack('<I', f.read(4))[0]
+    def read_table(self, dtype, count):
+        """Lê 'count' registros de uma vez como array NumPy (sem cópia)."""
+        table = np.frombuffer(self.data, dtype=dtype, count=count, offset=self.pos)
+        self.pos += table.nbytes
+        return table
+
+    def read_bytes(self, size):
+        """Retorna os próximos 'size' bytes como memoryview (sem cópia)."""
+        view = memoryview(self.data)[self.pos:self.pos + size]
+        self.pos += len(view)
+        return view
 
 # ==============================================================================
-# 3. MÓDULO DE DESCODIFICAÇÃO DE PIXEL (SIMULANDO ASprite.DecodeImage)
-#    Esta função converte os bytes codificados em pixels ARGB coloridos.
+# 3. MÓDULO DE DESCODIFICAÇÃO DE PIXEL (ASprite.DecodeImage)
+#    Converte os bytes codificados de um módulo em índices de paleta (NumPy)
+#    e, em seguida, em pixels RGBA.
 # ==============================================================================
 
-def decode_module(sprite, module_index, palette_index=0):
+# Formatos de codificação de pixels (ASprite.ENCODE_FORMAT_*)
+ENCODE_FORMAT_I2      = 0x0200  # 1 bit por pixel  (2 cores)
+ENCODE_FORMAT_I4      = 0x0400  # 2 bits por pixel (4 cores)
+ENCODE_FORMAT_I16     = 0x1600  # 4 bits por pixel (16 cores)
+ENCODE_FORMAT_I256    = 0x5602  # 1 byte por pixel
+ENCODE_FORMAT_I64RLE  = 0x64F0  # RLE: contagem e cor no mesmo byte
+ENCODE_FORMAT_I127RLE = 0x27F1  # RLE: byte > 127 = repetição, senão pixel único
+ENCODE_FORMAT_I256RLE = 0x56F2  # RLE: byte > 127 = trecho literal, senão repetição
+
+DATA_FORMAT_NAMES = {
+    ENCODE_FORMAT_I2: "I2",
+    ENCODE_FORMAT_I4: "I4",
+    ENCODE_FORMAT_I16: "I16",
+    ENCODE_FORMAT_I256: "I256",
+    ENCODE_FORMAT_I64RLE: "I64RLE",
+    ENCODE_FORMAT_I127RLE: "I127RLE",
+    ENCODE_FORMAT_I256RLE: "I256RLE",
+}
+
+# Valores usados pelas versões anteriores deste script (mantidos por compatibilidade)
+_LEGACY_DATA_FORMATS = {
+    0x100: ENCODE_FORMAT_I256,
+    0x127: ENCODE_FORMAT_I127RLE,
+    0x128: ENCODE_FORMAT_I256RLE,
+}
+
+# Bits por pixel dos formatos empacotados (pixels em ordem MSB -> LSB em cada byte)
+_PACKED_BITS = {
+    ENCODE_FORMAT_I2: 1,
+    ENCODE_FORMAT_I4: 2,
+    ENCODE_FORMAT_I16: 4,
+}
+
+# Formatos de cor das paletas (ASprite.PIXEL_FORMAT_*)
+PIXEL_FORMAT_8888 = 0x8888
+PIXEL_FORMAT_4444 = 0x4444
+PIXEL_FORMAT_1555 = 0x5515
+PIXEL_FORMAT_0565 = 0x6505
+
+COLOR_FORMAT_NAMES = {
+    PIXEL_FORMAT_8888: "8888",
+    PIXEL_FORMAT_4444: "4444",
+    PIXEL_FORMAT_1555: "1555",
+    PIXEL_FORMAT_0565: "0565",
+}
+
+# Grafias alternativas encontradas em ferramentas de terceiros
+_PIXEL_FORMAT_ALIASES = {
+    0x1555: PIXEL_FORMAT_1555,
+    0x0565: PIXEL_FORMAT_0565,
+}
+
+def normalize_color_format(color_format, verbose=True):
+    """Resolve apelidos; formatos desconhecidos são tratados como 0565."""
+    color_format = _PIXEL_FORMAT_ALIASES.get(color_format, color_format)
+    if color_format not in (PIXEL_FORMAT_8888, PIXEL_FORMAT_4444,
+                            PIXEL_FORMAT_1555, PIXEL_FORMAT_0565):
+        if verbose:
+            print(f"Aviso: Formato de cor {hex(color_format)} desconhecido. Usando 0565.")
+        return PIXEL_FORMAT_0565
+    return color_format
+
+def color_format_size(color_format):
+    """Bytes por cor no arquivo: 4 para 8888, 2 para os formatos de 16 bits."""
+    return 4 if color_format == PIXEL_FORMAT_8888 else 2
+
+def decode_palette_colors(raw, color_format):
+    """
+    Converte um array de cores brutas (uint16 ou uint32, qualquer forma) para
+    uint8 [..., 4] em (R, G, B, A), de uma vez, como o ASprite faz ao carregar.
+    """
+    raw = raw.astype(np.uint32)
+    if color_format == PIXEL_FORMAT_8888:
+        a, r, g, b = raw >> 24, raw >> 16, raw >> 8, raw
+    elif color_format == PIXEL_FORMAT_4444:
+        # Cada nibble é expandido para 8 bits (0xF -> 0xFF)
+        a, r, g, b = ((raw >> shift & 0xF) * 17 for shift in (12, 8, 4, 0))
+    elif color_format == PIXEL_FORMAT_1555:
+        a = np.where(raw & 0x8000, 0xFF, 0)
+        r = (raw >> 10 & 0x1F) << 3
+        g = (raw >> 5 & 0x1F) << 3
+        b = (raw & 0x1F) << 3
+    else:  # PIXEL_FORMAT_0565
+        # Magenta (0xF81F) é a cor-chave transparente das paletas 0565
+        a = np.where(raw == 0xF81F, 0, 0xFF)
+        r = (raw >> 11 & 0x1F) << 3
+        g = (raw >> 5 & 0x3F) << 2
+        b = (raw & 0x1F) << 3
+    return np.stack((r, g, b, a), axis=-1).astype(np.uint8)
+
+# Índice reservado para "nenhum pixel" (fora do intervalo 0-255)
+TRANSPARENT_INDEX = 256
+
+def palette_lut(sprite, palette_index=0):
+    """
+    Tabela uint8 (257, 4): índice de paleta -> (R, G, B, A).
+    Índices sem cor na paleta e TRANSPARENT_INDEX ficam transparentes.
+    """
+    lut = np.zeros((TRANSPARENT_INDEX + 1, 4), dtype=np.uint8)
+    if sprite.palettes and len(sprite.palettes[palette_index]) > 0:
+        palette = sprite.palettes[palette_index][:256]
+        lut[:len(palette)] = np.asarray(palette, dtype=np.uint8)
+    return lut
+
+def _unpack_bits(raw, bits, total_pixels):
+    """I2/I4/I16: desempacota 1, 2 ou 4 bits por pixel."""
+    if bits == 1:
+        return np.unpackbits(raw)[:total_pixels]
+    shifts = np.arange(8 - bits, -1, -bits, dtype=np.uint8)   # ex.: [6, 4, 2, 0]
+    mask = (1 << bits) - 1
+    return ((raw[:, None] >> shifts) & mask).reshape(-1)[:total_pixels]
+
+def _expand_tokens(src_start, counts, steps, raw, total_pixels):
+    """
+    Expande tokens RLE sem laço por pixel.
+    Cada token gera 'count' pixels lidos de raw[src_start + step * k] (k = 0..count-1):
+    step = 0 repete uma cor, step = 1 copia um trecho literal.
+    """
+    counts = counts.astype(np.int64)
+    ends = np.cumsum(counts)
+    n_out = int(ends[-1]) if len(ends) else 0
+    # Posição de cada pixel dentro do seu token
+    k = np.arange(n_out, dtype=np.int64) - np.repeat(ends - counts, counts)
+    src = np.repeat(src_start.astype(np.int64), counts) + np.repeat(steps, counts) * k
+    np.minimum(src, len(raw) - 1, out=src)  # dados truncados: repete o último byte
+    return raw[src][:total_pixels]
+
+def _decode_i64rle(raw, n_colors, total_pixels):
+    """I64RLE: os bits baixos são a cor, os altos a contagem - 1."""
+    bits = min(6, max(1, (n_colors - 1).bit_length()))
+    colors = raw & ((1 << bits) - 1)
+    counts = (raw >> bits).astype(np.int64) + 1
+    return np.repeat(colors, counts)[:total_pixels]
+
+def _decode_i127rle(raw, total_pixels):
+    """
+    I127RLE: c > 127 -> (c - 128) repetições do byte seguinte; senão, 1 pixel de cor c.
+    Os inícios de token são achados de forma vetorizada: numa sequência contínua de
+    bytes > 127 os tokens alternam (cabeçalho, cor, cabeçalho, ...) a partir do início.
+    """
+    n = len(raw)
+    if n == 0:
+        return raw
+    idx = np.arange(n)
+    high = raw > 127
+    prev_high = np.concatenate(([False], high[:-1]))
+    run_start = np.maximum.accumulate(np.where(high & ~prev_high, idx, 0))
+    high_head = high & ((idx - run_start) % 2 == 0)
+    prev_high_head = np.concatenate(([False], high_head[:-1]))
+    heads = np.flatnonzero(high_head | (~high & ~prev_high_head))
+
+    is_run = high[heads]
+    counts = np.where(is_run, raw[heads].astype(np.int64) - 128, 1)
+    src_start = heads + is_run          # repetição: cor no byte seguinte
+    steps = np.zeros(len(heads), dtype=np.int64)
+    return _expand_tokens(src_start, counts, steps, raw, total_pixels)
+
+def _decode_i256rle(data, raw, total_pixels):
+    """
+    I256RLE: c > 127 -> (c - 128) pixels literais a seguir; senão, c repetições do
+    byte seguinte. Só os cabeçalhos de token são percorridos em Python; a expansão
+    dos pixels é feita em NumPy.
+    """
+    heads, lengths = [], []
+    pos, produced, n = 0, 0, len(data)
+    while pos < n and produced < total_pixels:
+        c = data[pos]
+        heads.append(pos)
+        if c > 127:
+            c -= 128
+            pos += 1 + c
+        else:
+            pos += 2
+        lengths.append(c)
+        produced += c
+
+    heads = np.array(heads, dtype=np.int64)
+    codes = raw[heads]
+    counts = np.array(lengths, dtype=np.int64)
+    steps = (codes > 127).astype(np.int64)  # literal: avança 1 byte por pixel
+    return _expand_tokens(heads + 1, counts, steps, raw, total_pixels)
+
+def decode_pixels(data, width, height, data_format, n_colors=256):
+    """
+    Decodifica os bytes de UM módulo em um array uint8 (altura, largura) de índices
+    de paleta. Retorna None se o formato não for suportado.
+    """
+    data_format = _LEGACY_DATA_FORMATS.get(data_format, data_format)
+    total_pixels = width * height
+    raw = np.frombuffer(data, dtype=np.uint8)
+
+    if data_format in _PACKED_BITS:
+        indices = _unpack_bits(raw, _PACKED_BITS[data_format], total_pixels)
+    elif data_format == ENCODE_FORMAT_I256:
+        indices = raw[:total_pixels]
+    elif data_format == ENCODE_FORMAT_I64RLE:
+        indices = _decode_i64rle(raw, n_colors, total_pixels)
+    elif data_format == ENCODE_FORMAT_I127RLE:
+        indices = _decode_i127rle(raw, total_pixels)
+    elif data_format == ENCODE_FORMAT_I256RLE:
+        indices = _decode_i256rle(data, raw, total_pixels)
+    else:
+        print(f"Erro: Formato de dados {hex(data_format)} não suportado.")
+        return None
+
+    if len(indices) < total_pixels:
+        # Dados curtos: completa com o índice 0 (normalmente transparente)
+        indices = np.concatenate((indices, np.zeros(total_pixels - len(indices), np.uint8)))
+    return indices.astype(np.uint8, copy=False).reshape(height, width)
+
+def decode_module_indices(sprite, module_index):
     """
-    Decodifica o array de bytes do módulo para uma imagem PIL.
-    Esta é uma simulação da lógica de descompressão RLE e conversão de índice.
+    Decodifica o módulo 'module_index' de 'sprite.modules_data' em índices de paleta.
     """
     if module_index >= len(sprite.modules) or not sprite.modules[module_index]:
         print(f"Erro: Módulo {module_index} inválido.")
         return None
 
+    if module_index in sprite.edited_modules:
+        return sprite.edited_modules[module_index]
+
     width, height = sprite.modules[module_index]
-    palette = sprite.palettes[palette_index]
-    
-    # Offsets de dados não são armazenados no objeto BSprite, mas seriam calculados
-    # por uma função 'LoadSprite' mais completa.
-    # Para este exemplo, *precisamos* do offset de início do módulo no array 'modules_data'.
-    # O ASprite.java lê o tamanho do módulo, mas não armazena offsets.
-    # Esta função assume que o dado binário bruto *para este módulo* é passado.
-    # Iremos simular a descompressão.
-    
-    # --------------------------------------------------------------------------
-    # --- ASSUNÇÃO: Para o extrator, precisamos do array de índices de paleta ---
-    # --------------------------------------------------------------------------
-    
-    # *** ESTA PARTE REQUER O ALGORITMO EXATO DE COMPACTAÇÃO ***
-    # Como não temos o DecodeImage, assumimos uma descompressão simples para I256.
-    
-    # Vamos criar um array fictício de índices de paleta (pixels_indices)
-    # Aqui, na vida real, você descompactaria 'sprite.modules_data' no offset correto.
-    
-    total_pixels = width * height
-    pixels_indices = [] # Array de índices da paleta (0 a 255)
+    data = sprite.module_data(module_index)
+    n_colors = len(sprite.palettes[0]) if sprite.palettes else 256
+    return decode_pixels(data, width, height, sprite.data_format, n_colors)
 
-    if sprite.data_format == 0x100: # I256 (1 byte por pixel - sem compressão)
-        # Implementação simulada: Leitura direta de 1 byte por pixel (índice 0-255)
-        # Se você tivesse o array 'modules_data' segmentado:
-        # pixels_indices = list(raw_module_data)
-        
-        # Como não temos o 'raw_module_data' segmentado, vamos retornar uma imagem vazia
-        # ou, se o objetivo é mostrar a estrutura, podemos simular:
-        pass # A descompressão real deve vir aqui
-        
-    elif sprite.data_format in [0x127, 0x128]: # I127RLE, I256RLE
-        # Descompressão RLE deve ser implementada aqui.
-        pass
-        
-    # --- SIMULAÇÃO PARA DEMONSTRAÇÃO (Todos os pixels pretos) ---
-    pixels_indices = [0] * total_pixels 
-    # ------------------------------------------------------------
-    
-    
-    # Agora, mapear índices para cores ARGB (32-bit integer)
-    pixels_argb = []
-    
-    if len(palette) > 0:
-        for index in pixels_indices:
-            # O índice 0 geralmente é a cor transparente (ou a primeira cor da paleta)
-            if index < len(palette):
-                color = palette[index]
-                # A paleta já deve estar no formato (R, G, B, A)
-                pixels_argb.append(color)
-            else:
-                pixels_argb.append((0, 0, 0, 0)) # Cor transparente se o índice for inválido
-    else:
-        # Paleta vazia, pixels transparentes
-        pixels_argb = [(0, 0, 0, 0)] * total_pixels
+def decode_module(sprite, module_index, palette_index=0):
+    """
+    Decodifica o array de bytes do módulo para uma imagem PIL (RGBA).
+    """
+    indices = decode_module_indices(sprite, module_index)
+    if indices is None:
+        return None
 
-    # Criar a imagem PIL (RGBA)
-    img = Image.new('RGBA', (width, height))
-    
-    # A biblioteca PIL aceita (R, G, B, A) tuplas
-    img.putdata(pixels_argb)
-    return img
+    # Tabela índice -> (R, G, B, A); índices fora da paleta ficam transparentes
+    return Image.fromarray(palette_lut(sprite, palette_index)[indices])
 
 # ==============================================================================
 # 4. FUNÇÃO DE LEITURA PRINCIPAL (BSprite.Load)
 #    Lê todo o arquivo binário e preenche o objeto BSprite
 # ==============================================================================
 
-def load_bsprite(file_path):
+def parse_bsprite(data, verbose=True):
     """
-    Carrega o arquivo BSprite e desserializa suas estruturas internas.
+    Desserializa um BSprite a partir do conteúdo completo do arquivo (bytes).
     """
     sprite = BSprite()
-    
+    r = BufferReader(data)
+
+    # --- 4.1. CABEÇALHO ---
+    sprite.version = r.read_short() # ASprite.bs_version (0x03DF para v003)
+    sprite.flags = r.read_int()     # ASprite.bs_flags
+
+    if sprite.version != 0x03DF and verbose:
+        print(f"Aviso: Versão BSprite ({hex(sprite.version)}) não é a esperada (0x03DF). A leitura pode falhar.")
+
+    # --- 4.2. ESTRUTURA DO SPRITE ---
+    # Cada tabela é lida em um único passo; tolist() gera as tuplas em C.
+
+    # Módulos (Largura e Altura)
+    n_modules = r.read_short()
+    sprite.modules = r.read_table(MODULE_DTYPE, n_modules).tolist()
+
+    # FModules (Índices e Offsets)
+    n_fmodules = r.read_short()
+    sprite.fmodules = r.read_table(FMODULE_DTYPE, n_fmodules).tolist()
+
+    # Frames (Contagem de FModules, Índice de Início e Bounding Box)
+    # ASprite.java verifica se precisa ler o bounds rect; assumimos que sempre é lido.
+    n_frames = r.read_short()
+    sprite.frames = [FrameInfo(count, start, (x, y, w, h))
+                     for count, start, x, y, w, h in r.read_table(FRAME_DTYPE, n_frames).tolist()]
+
+    # AFrames (Quadro, Duração, Offsets, Flags)
+    n_aframes = r.read_short()
+    sprite.aframes = r.read_table(AFRAME_DTYPE, n_aframes).tolist()
+
+    # Anims (Contagem de AFrames e Índice de Início)
+    n_anims = r.read_short()
+    anims_af_start = r.read_table(np.dtype('<u2'), n_anims).tolist()
+    anims_af_count = r.read_table(np.dtype('u1'), n_anims).tolist()
+    sprite.anims = [AnimInfo(count, start) for count, start in zip(anims_af_count, anims_af_start)]
+
+    # --- 4.3. PALETA DE CORES ---
+
+    color_format = r.read_short() # 0x8888, 0x4444, 0x5515 (1555), 0x6505 (0565)
+    n_palettes = r.read_byte()    # Número de paletas (geralmente 1 ou 2)
+    n_colors = r.read_byte()      # Número de cores por paleta
+
+    # Todas as paletas são convertidas de uma vez para tabelas uint8 (n_colors, 4)
+    sprite.color_format = color_format  # valor original, regravado como está
+    pixel_format = normalize_color_format(color_format, verbose)
+    raw_dtype = np.dtype('<u4') if color_format_size(pixel_format) == 4 else np.dtype('<u2')
+    raw_colors = r.read_table(raw_dtype, n_palettes * n_colors).reshape(n_palettes, n_colors)
+    sprite.palettes = list(decode_palette_colors(raw_colors, pixel_format))
+
+    # --- 4.4. DADOS DE IMAGEM CODIFICADOS ---
+
+    sprite.data_format = r.read_short()
+
+    # O código Java lê o tamanho do bloco para CADA módulo antes de ler o array.
+    # A soma acumulada dos tamanhos vira a tabela de offsets de cada módulo.
+    module_data_lens = r.read_table(np.dtype('<u2'), n_modules)
+    sprite.module_offsets = array('I', accumulate(module_data_lens.tolist(), initial=0))
+    total_data_len = sprite.module_offsets[-1]
+
+    sprite.modules_data = r.read_bytes(total_data_len)
+
+    if verbose:
+        print(f"Sucesso: Arquivo BSprite carregado com {n_modules} Módulos e {n_anims} Animações.")
+    return sprite
+
+def load_bsprite(file_path, lazy=False, verbose=True):
+    """
+    Carrega o arquivo BSprite e desserializa suas estruturas internas.
+
+    Com lazy=True o arquivo é mapeado na memória (mmap) em vez de lido: só o
+    cabeçalho e as tabelas são tocados ao carregar, e os bytes de pixel de um
+    módulo só são lidos do disco quando ele é decodificado pela primeira vez.
+    Use sprite.close() (ou 'with') para liberar o mapeamento.
+    """
     try:
         with open(file_path, 'rb') as f:
-            
-            # --- 4.1. CABEÇALHO ---
-            sprite.version = read_short(f) # ASprite.bs_version (0x03DF para v003)
-            sprite.flags = read_int(f)     # ASprite.bs_flags
-            
-            if sprite.version != 0x03DF:
-                print(f"Aviso: Versão BSprite ({hex(sprite.version)}) não é a esperada (0x03DF). A leitura pode falhar.")
+            if not lazy:
+                return parse_bsprite(f.read(), verbose)
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-            # --- 4.2. ESTRUTURA DO SPRITE ---
-            
-            # Módulos (Largura e Altura)
-            n_modules = read_short(f)
-            sprite.modules = []
-            for _ in range(n_modules):
-                w = read_byte(f)
-                h = read_byte(f)
-                sprite.modules.append((w, h))
-
-            # FModules (Índices e Offsets)
-            n_fmodules = read_short(f)
-            sprite.fmodules = []
-            for _ in range(n_fmodules):
-                module_index = read_byte(f)
-                offset_x = read_byte(f)
-                offset_y = read_byte(f)
-                flags = read_byte(f)
-                sprite.fmodules.append((module_index, offset_x, offset_y, flags))
-            
-            # Frames (Contagem de FModules e Índice de Início)
-            n_frames = read_short(f)
-            sprite.frames = []
-            for _ in range(n_frames):
-                fmodule_count = read_byte(f)
-                fmodule_start_index = read_short(f)
-                bounds_rect = None
-                # ASprite.java verifica se precisa ler o bounds rect.
-                # Assumindo que o bounds rect é lido:
-                x = read_byte(f)
-                y = read_byte(f)
-                w = read_byte(f)
-                h = read_byte(f)
-                bounds_rect = (x, y, w, h)
-                sprite.frames.append(FrameInfo(fmodule_count, fmodule_start_index, bounds_rect))
-
-            # AFrames (Quadro, Duração, Offsets)
-            n_aframes = read_short(f)
-            sprite.aframes = []
-            for _ in range(n_aframes):
-                frame_index = read_byte(f)
-                duration = read_byte(f)
-                offset_x = read_byte(f)
-                offset_y = read_byte(f)
-                flags = read_byte(f)
-                sprite.aframes.append((frame_index, duration, offset_x, offset_y, flags))
-
-            # Anims (Contagem de AFrames e Índice de Início)
-            n_anims = read_short(f)
-            sprite.anims = []
-            anims_af_start = [read_short(f) for _ in range(n_anims)]
-            anims_af_count = [read_byte(f) for _ in range(n_anims)]
-
-            for i in range(n_anims):
-                sprite.anims.append(AnimInfo(anims_af_count[i], anims_af_start[i]))
-                
-            # --- 4.3. PALETA DE CORES ---
-            
-            color_format = read_short(f) # 0x8888, 0x4444, etc.
-            n_palettes = read_byte(f)    # Número de paletas (geralmente 1 ou 2)
-            n_colors = read_byte(f)      # Número de cores por paleta
-
-            sprite.palettes = []
-            # O Java converte cores de 4444, 1555, 0565 para ARGB 32-bit.
-            # Aqui, leremos as cores brutas e faremos uma conversão simples para ARGB (R, G, B, A).
-            for p in range(n_palettes):
-                palette = []
-                for c in range(n_colors):
-                    # Assumindo que a paleta está no formato ARGB de 32 bits (int)
-                    # Se estiver em 16 bits (short), a lógica muda.
-                    # O código Java lê em 32 bits depois da conversão interna.
-                    # Vamos ler 32 bits (4 bytes) e decompor, ou 16 bits (2 bytes) se for 4444/1555.
-                    
-                    # Simulação do formato 16-bit (R5G6B5 ou similar)
-                    if color_format != 0x8888 and color_format != 0x4444:
-                       # Se não for 32-bit completo (raro em paletas BSprite v003), leia 2 bytes
-                       raw_color = read_short(f) 
-                       # Conversão de R5G6B5 para R, G, B:
-                       r = ((raw_color >> 11) & 0x1F) << 3
-                       g = ((raw_color >> 5) & 0x3F) << 2
-                       b = (raw_color & 0x1F) << 3
-                       a = 255 # Assume opaco
-                    else:
-                       # Assumindo 32-bit ARGB, lendo 4 bytes:
-                       raw_color = read_int(f)
-                       a = (raw_color >> 24) & 0xFF
-                       r = (raw_color >> 16) & 0xFF
-                       g = (raw_color >> 8) & 0xFF
-                       b = raw_color & 0xFF
-                       
-                    palette.append((r, g, b, a))
-                sprite.palettes.append(palette)
-
-            # --- 4.4. DADOS DE IMAGEM CODIFICADOS ---
-            
-            sprite.data_format = read_short(f)
-            
-            # O código Java lê o tamanho do bloco para CADA módulo antes de ler o array.
-            # Aqui, lemos apenas a soma dos tamanhos dos dados de imagem.
-            total_data_len = 0
-            for i in range(n_modules):
-                module_data_len = read_short(f)
-                total_data_len += module_data_len
-                # Na vida real, você salvaria este 'module_data_len' para saber onde começar a ler.
-                
-            sprite.modules_data = f.read(total_data_len)
-            
-            print(f"Sucesso: Arquivo BSprite carregado com {n_modules} Módulos e {n_anims} Animações.")
-            return sprite
+        try:
+            sprite = parse_bsprite(mapping, verbose)
+        except Exception:
+            try:
+                mapping.close()
+            except BufferError:
+                pass
+            raise
+        sprite._mmap = mapping
+        return sprite
 
     except FileNotFoundError:
         print(f"Erro: Arquivo não encontrado em {file_path}")
         return None
-    except struct.error as e:
+    except (struct.error, ValueError) as e:
         print(f"Erro de estrutura binária: O arquivo parece estar corrompido ou o formato não é BSprite v003. Detalhes: {e}")
         return None
     except Exception as e:
         print(f"Erro inesperado durante o carregamento: {e}")
         return None
 
+# ==============================================================================
+# 4B. CODIFICAÇÃO E ESCRITA (BSprite.Save)
+#     Operação inversa de parse_bsprite: módulos não editados são copiados byte
+#     a byte; módulos repintados são recodificados no 'data_format' do sprite.
+# ==============================================================================
+
+def _find_runs(flat):
+    """Divide um array 1D em sequências de valores iguais: (inícios, tamanhos, valores)."""
+    if len(flat) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, flat
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(flat)])))
+    return starts, lengths, flat[starts]
+
+def _encode_packed(flat, bits):
+    per_byte = 8 // bits
+    if len(flat) and int(flat.max()) >= (1 << bits):
+        raise ValueError(f"Índice de cor {int(flat.max())} não cabe em {bits} bit(s) por pixel.")
+    padded = np.zeros(-(-len(flat) // per_byte) * per_byte, dtype=np.uint8)
+    padded[:len(flat)] = flat
+    shifts = np.arange(8 - bits, -1, -bits, dtype=np.uint8)
+    return np.bitwise_or.reduce(padded.reshape(-1, per_byte) << shifts, axis=1).astype(np.uint8).tobytes()
+
+def _encode_i64rle(flat, n_colors):
+    bits = min(6, max(1, (n_colors - 1).bit_length()))
+    if len(flat) and int(flat.max()) >= (1 << bits):
+        raise ValueError(f"Índice de cor {int(flat.max())} não cabe no I64RLE desta paleta.")
+    max_count = 1 << (8 - bits)
+    out = bytearray()
+    for _, length, color in zip(*_find_runs(flat)):
+        length, color = int(length), int(color)
+        while length > 0:
+            count = min(length, max_count)
+            out.append(((count - 1) << bits) | color)
+            length -= count
+    return bytes(out)
+
+def _encode_i127rle(flat):
+    out = bytearray()
+    for _, length, color in zip(*_find_runs(flat)):
+        length, color = int(length), int(color)
+        if length == 1 and color <= 127:
+            out.append(color)        # pixel único
+            continue
+        while length > 0:
+            count = min(length, 127)
+            out += bytes((128 + count, color))
+            length -= count
+    return bytes(out)
+
+def _encode_i256rle(flat):
+    out = bytearray()
+    literal = bytearray()
+
+    def flush_literal():
+        for k in range(0, len(literal), 127):
+            chunk = literal[k:k + 127]
+            out.append(128 + len(chunk))
+            out.extend(chunk)
+        literal.clear()
+
+    for _, length, color in zip(*_find_runs(flat)):
+        length, color = int(length), int(color)
+        if length < 3:
+            literal.extend(bytes((color,)) * length)  # sequências curtas viram literais
+            continue
+        flush_literal()
+        while length > 0:
+            count = min(length, 127)
+            out += bytes((count, color))
+            length -= count
+    flush_literal()
+    return bytes(out)
+
+def encode_pixels(indices, data_format, n_colors=256):
+    """Codifica um array (altura, largura) de índices de paleta no 'data_format'."""
+    data_format = _LEGACY_DATA_FORMATS.get(data_format, data_format)
+    flat = np.ascontiguousarray(indices, dtype=np.uint8).reshape(-1)
+
+    if data_format in _PACKED_BITS:
+        return _encode_packed(flat, _PACKED_BITS[data_format])
+    if data_format == ENCODE_FORMAT_I256:
+        return flat.tobytes()
+    if data_format == ENCODE_FORMAT_I64RLE:
+        return _encode_i64rle(flat, n_colors)
+    if data_format == ENCODE_FORMAT_I127RLE:
+        return _encode_i127rle(flat)
+    if data_format == ENCODE_FORMAT_I256RLE:
+        return _encode_i256rle(flat)
+    raise ValueError(f"Formato de dados {hex(data_format)} não suportado para escrita.")
+
+def encode_palette_colors(colors, color_format):
+    """Inverso de decode_palette_colors: uint8 [..., 4] (R, G, B, A) -> cores brutas."""
+    c = colors.astype(np.uint32)
+    r, g, b, a = c[..., 0], c[..., 1], c[..., 2], c[..., 3]
+    if color_format == PIXEL_FORMAT_8888:
+        return ((a << 24) | (r << 16) | (g << 8) | b).astype('<u4')
+    if color_format == PIXEL_FORMAT_4444:
+        raw = ((a // 17) << 12) | ((r // 17) << 8) | ((g // 17) << 4) | (b // 17)
+    elif color_format == PIXEL_FORMAT_1555:
+        raw = np.where(a > 0, 0x8000, 0) | ((r >> 3) << 10) | ((g >> 3) << 5) | (b >> 3)
+    else:  # PIXEL_FORMAT_0565
+        raw = np.where(a == 0, 0xF81F, ((r >> 3) << 11) | ((g >> 2) << 5) | (b >> 3))
+    return raw.astype('<u2')
+
+def set_module_indices(sprite, module_index, indices):
+    """
+    Substitui os pixels de um módulo (array uint8 altura x largura de índices).
+    O módulo passa a ser recodificado ao salvar; o cache do sprite é limpo.
+    """
+    indices = np.asarray(indices, dtype=np.uint8)
+    height, width = indices.shape
+    if width > 255 or height > 255:
+        raise ValueError(f"Módulo {module_index}: {width}x{height} excede 255x255.")
+    sprite.modules[module_index] = (width, height)
+    sprite.edited_modules[module_index] = indices
+    sprite.module_cache.clear()
+
+def set_module_image(sprite, module_index, image, palette_index=0):
+    """
+    Repinta um módulo a partir de uma imagem PIL. Cada cor é convertida para o
+    índice mais próximo da paleta; pixels com alfa 0 usam a cor transparente.
+    """
+    rgba = np.asarray(image.convert('RGBA'), dtype=np.int32)
+    lut = palette_lut(sprite, palette_index)[:len(sprite.palettes[palette_index])].astype(np.int32)
+
+    colors, inverse = np.unique(rgba.reshape(-1, 4), axis=0, return_inverse=True)
+    distance = ((colors[:, None, :3] - lut[None, :, :3]) ** 2).sum(axis=2)
+    # Transparente só casa com transparente (e vice-versa)
+    distance += np.where((colors[:, None, 3] == 0) != (lut[None, :, 3] == 0), 1 << 20, 0)
+    nearest = distance.argmin(axis=1).astype(np.uint8)
+    set_module_indices(sprite, module_index, nearest[inverse.reshape(-1)].reshape(rgba.shape[:2]))
+
+def serialize_bsprite(sprite):
+    """Serializa o BSprite para bytes no mesmo layout lido por parse_bsprite."""
+    parts = [struct.pack('<HI', sprite.version, sprite.flags)]
+
+    def table(rows, dtype):
+        parts.append(struct.pack('<H', len(rows)))
+        parts.append(np.array(rows, dtype=dtype).tobytes() if rows else b"")
+
+    table([tuple(m) for m in sprite.modules], MODULE_DTYPE)
+    table([tuple(fm) for fm in sprite.fmodules], FMODULE_DTYPE)
+    table([(fr.fmodule_count, fr.fmodule_start_index) + tuple(fr.bounds_rect) for fr in sprite.frames],
+          FRAME_DTYPE)
+    table([tuple(af) for af in sprite.aframes], AFRAME_DTYPE)
+
+    parts.append(struct.pack('<H', len(sprite.anims)))
+    parts.append(np.array([a.aframe_start_index for a in sprite.anims], dtype='<u2').tobytes())
+    parts.append(np.array([a.aframe_count for a in sprite.anims], dtype='u1').tobytes())
+
+    # Paletas
+    n_colors = len(sprite.palettes[0]) if sprite.palettes else 0
+    parts.append(struct.pack('<HBB', sprite.color_format, len(sprite.palettes), n_colors))
+    if sprite.palettes:
+        colors = np.stack(sprite.palettes)
+        parts.append(encode_palette_colors(colors, normalize_color_format(sprite.color_format)).tobytes())
+
+    # Dados dos módulos + tabela de tamanhos reconstruída
+    parts.append(struct.pack('<H', sprite.data_format))
+    module_bytes = []
+    for i in range(len(sprite.modules)):
+        if i in sprite.edited_modules:
+            module_bytes.append(encode_pixels(sprite.edited_modules[i], sprite.data_format,
+                                              n_colors or 256))
+        else:
+            module_bytes.append(sprite.module_data(i))
+    lengths = [len(m) for m in module_bytes]
+    if lengths and max(lengths) > 0xFFFF:
+        raise ValueError("Dados de um módulo excedem 65535 bytes.")
+    parts.append(np.array(lengths, dtype='<u2').tobytes())
+    parts.extend(module_bytes)
+    return b"".join(parts)
+
+def save_bsprite(sprite, file_path):
+    """Grava o BSprite em 'file_path'. Retorna True em caso de sucesso."""
+    try:
+        data = serialize_bsprite(sprite)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        print(f"Sucesso: BSprite salvo em {file_path} ({len(data)} bytes).")
+        return True
+    except (ValueError, OSError) as e:
+        print(f"Erro ao salvar BSprite: {e}")
+        return False
+
 # ==============================================================================
 # 5. MÓDULO DE RENDERIZAÇÃO DE FRAME
 #    Combina Módulos em um Frame de Imagem
 # ==============================================================================
 
+# Flags de transformação de um FModule
+FLAG_FLIP_X = 0x01
+FLAG_FLIP_Y = 0x02
+FLAG_ROT_90 = 0x04
+FLAG_TRANSFORM_MASK = FLAG_FLIP_X | FLAG_FLIP_Y | FLAG_ROT_90
+
+def get_module_image(sprite, module_index, palette_index=0, flags=0):
+    """
+    Retorna o módulo decodificado e já transformado (flip/rotação), usando o
+    cache LRU do sprite: cada combinação (módulo, paleta, flags) é decodificada uma vez.
+    """
+    key = (module_index, palette_index, flags & FLAG_TRANSFORM_MASK)
+    module_img = sprite.module_cache.get(key)
+    if module_img is not None:
+        return module_img
+
+    module_img = decode_module(sprite, module_index, palette_index)
+    if module_img is None:
+        return None
+
+    # Os flags (0x01, 0x02, 0x04) definem as transformações em tempo de execução
+
+    # FLAG_FLIP_X (Espelhamento horizontal)
+    if flags & FLAG_FLIP_X:
+        module_img = module_img.transpose(Image.FLIP_LEFT_RIGHT)
+
+    # FLAG_FLIP_Y (Espelhamento vertical)
+    if flags & FLAG_FLIP_Y:
+        module_img = module_img.transpose(Image.FLIP_TOP_BOTTOM)
+
+    # FLAG_ROT_90 (Rotação 90 graus)
+    if flags & FLAG_ROT_90:
+        module_img = module_img.transpose(Image.ROTATE_90)
+
+    sprite.module_cache.put(key, module_img)
+    return module_img
+
 def render_frame_to_image(sprite, frame_index, palette_index=0):
     """
     Renderiza um frame específico do sprite em uma imagem PIL.
@@ -302,27 +787,11 @@ def render_frame_to_image(sprite, frame_index, palette_index=0):
             
         module_index, offset_x, offset_y, flags = sprite.fmodules[fm_index]
         
-        # 5.3. Decodificar o Módulo (Simulado)
-        # Note: A decodificação real deve ser feita uma vez e armazenada.
-        module_img = decode_module(sprite, module_index, palette_index)
+        # 5.3. Decodificar e transformar o Módulo (com cache)
+        module_img = get_module_image(sprite, module_index, palette_index, flags)
         
         if module_img:
-            # 5.4. Aplicar transformações (Flip/Rotação)
-            # Os flags (0x01, 0x02, 0x04) definem as transformações em tempo de execução
-            
-            # FLAG_FLIP_X (Espelhamento horizontal)
-            if flags & 0x01:
-                module_img = module_img.transpose(Image.FLIP_LEFT_RIGHT)
-            
-            # FLAG_FLIP_Y (Espelhamento vertical)
-            if flags & 0x02:
-                module_img = module_img.transpose(Image.FLIP_TOP_BOTTOM)
-                
-            # FLAG_ROT_90 (Rotação 90 graus)
-            if flags & 0x04:
-                module_img = module_img.transpose(Image.ROTATE_90)
-
-            # 5.5. Colar na imagem final
+            # 5.4. Colar na imagem final
             # O offset_x/y são relativos ao Frame Bounding Box (x, y)
             paste_x = offset_x - x
             paste_y = offset_y - y
@@ -331,11 +800,119 @@ def render_frame_to_image(sprite, frame_index, palette_index=0):
 
     return img
 
+# ------------------------------------------------------------------------------
+# 5B. COMPOSITOR NUMPY
+#     Alternativa ao paste por módulo: os índices de paleta são copiados para um
+#     único canvas com fatiamento NumPy e a paleta é aplicada uma única vez.
+# ------------------------------------------------------------------------------
+
+def get_module_indices(sprite, module_index, flags=0):
+    """
+    Índices de paleta do módulo com flip/rotação aplicados como views NumPy.
+    O módulo sem transformação é guardado no cache do sprite (paleta = None).
+    """
+    key = (module_index, None, 0)
+    indices = sprite.module_cache.get(key)
+    if indices is None:
+        indices = decode_module_indices(sprite, module_index)
+        if indices is None:
+            return None
+        sprite.module_cache.put(key, indices)
+
+    if flags & FLAG_FLIP_X:
+        indices = indices[:, ::-1]
+    if flags & FLAG_FLIP_Y:
+        indices = indices[::-1, :]
+    if flags & FLAG_ROT_90:
+        indices = np.rot90(indices)  # anti-horário, igual a Image.ROTATE_90
+    return indices
+
+def compose_frame_indices(sprite, frame_index, palette_index=0):
+    """
+    Compõe um frame em um canvas uint16 (altura, largura) de índices de paleta.
+    Pixels não cobertos valem TRANSPARENT_INDEX. A transparência de cada módulo
+    vem do alfa da paleta 'palette_index' (alfa 0 não sobrescreve o canvas;
+    pixels semitransparentes sobrescrevem, sem mistura).
+    """
+    if frame_index >= len(sprite.frames):
+        return None
+
+    frame = sprite.frames[frame_index]
+    x, y, w, h = frame.bounds_rect
+    if w == 0 or h == 0:
+        print("Aviso: Bounding Box inválida. Usando dimensões mínimas.")
+        w, h = 1, 1
+
+    canvas = np.full((h, w), TRANSPARENT_INDEX, dtype=np.uint16)
+    opaque = palette_lut(sprite, palette_index)[:, 3] > 0
+
+    fmodule_end = frame.fmodule_start_index + frame.fmodule_count
+    for fm_index in range(frame.fmodule_start_index, fmodule_end):
+        if fm_index >= len(sprite.fmodules):
+            print(f"Erro: Índice de FModule {fm_index} fora do alcance.")
+            continue
+
+        module_index, offset_x, offset_y, flags = sprite.fmodules[fm_index]
+        indices = get_module_indices(sprite, module_index, flags)
+        if indices is None:
+            continue
+
+        # Recorte do módulo contra os limites do canvas
+        mh, mw = indices.shape
+        dx, dy = offset_x - x, offset_y - y
+        x0, y0 = max(dx, 0), max(dy, 0)
+        x1, y1 = min(dx + mw, w), min(dy + mh, h)
+        if x0 >= x1 or y0 >= y1:
+            continue
+
+        src = indices[y0 - dy:y1 - dy, x0 - dx:x1 - dx]
+        np.copyto(canvas[y0:y1, x0:x1], src, where=opaque[src])
+
+    return canvas
+
+def render_frame_numpy(sprite, frame_index, palette_index=0):
+    """
+    Equivalente a render_frame_to_image usando o compositor NumPy:
+    um único lookup de paleta para o frame inteiro.
+    """
+    canvas = compose_frame_indices(sprite, frame_index, palette_index)
+    if canvas is None:
+        return None
+    return Image.fromarray(palette_lut(sprite, palette_index)[canvas])
+
+def palette_lut_stack(sprite):
+    """Todas as paletas do sprite empilhadas: uint8 (n_paletas, 257, 4)."""
+    return np.stack([palette_lut(sprite, p) for p in range(max(len(sprite.palettes), 1))])
+
+def render_frame_all_palettes(sprite, frame_index):
+    """
+    Renderiza o frame em TODAS as paletas de uma vez: os módulos são decodificados
+    e compostos uma única vez e a pilha de LUTs é aplicada num único lookup.
+    Paletas com canais alfa diferentes (transparência diferente) são compostas
+    separadamente, uma vez por grupo. Retorna uma lista de imagens PIL (uma por paleta).
+    """
+    if frame_index >= len(sprite.frames):
+        return None
+
+    luts = palette_lut_stack(sprite)
+
+    # Agrupa as paletas pelo alfa: mesma transparência = mesma composição
+    groups = {}
+    for p in range(len(luts)):
+        groups.setdefault(luts[p, :, 3].tobytes(), []).append(p)
+
+    images = [None] * len(luts)
+    for members in groups.values():
+        canvas = compose_frame_indices(sprite, frame_index, members[0])
+        for p, rgba in zip(members, luts[members][:, canvas]):
+            images[p] = Image.fromarray(rgba)
+    return images
+
 # ==============================================================================
 # 6. FUNÇÃO PRINCIPAL DE VISUALIZAÇÃO/EXTRAÇÃO
 # ==============================================================================
 
-def main_extractor(file_path):
+def main_extractor(file_path, compositor='numpy'):
     # 1. Carregar o arquivo BSprite
     sprite = load_bsprite(file_path)
 
@@ -344,7 +921,6 @@ def main_extractor(file_path):
 
     # 2. Iterar e extrair todos os Frames
     output_dir = "extracted_frames"
-    import os
     os.makedirs(output_dir, exist_ok=True)
     
     print(f"\nTentando renderizar e extrair {len(sprite.frames)} Frames...")
@@ -354,7 +930,10 @@ def main_extractor(file_path):
         # não estiver 100% correta para o seu arquivo, esta parte pode falhar.
         
         # Usamos o índice de paleta 0 por padrão
-        frame_image = render_frame_to_image(sprite, i, palette_index=0)
+        if compositor == 'numpy':
+            frame_image = render_frame_numpy(sprite, i, palette_index=0)
+        else:
+            frame_image = render_frame_to_image(sprite, i, palette_index=0)
         
         if frame_image:
             output_filename = os.path.join(output_dir, f"frame_{i:03d}.png")
@@ -373,27 +952,818 @@ def main_extractor(file_path):
     print(f"Total de Módulos (Peças Gráficas): {len(sprite.modules)}")
     print(f"Total de Frames (Estágios do Sprite): {len(sprite.frames)}")
     print(f"Total de Animações: {len(sprite.anims)}")
+    cache = sprite.module_cache.stats()
+    print(f"Cache de Módulos: {cache['hits']} acertos, {cache['misses']} falhas ({cache['hit_rate']:.0%})")
     
     if len(sprite.anims) > 0:
         anim_0 = sprite.anims[0]
         print(f"Animação 0: {anim_0.aframe_count} AFrames, Início em {anim_0.aframe_start_index}")
 
 # ==============================================================================
-# 7. EXECUÇÃO
+# 7. EXTRAÇÃO EM LOTE
+#    Percorre uma pasta (ou um .jar) e renderiza todos os .bsprite em paralelo.
+# ==============================================================================
+
+BSPRITE_EXT = ".bsprite"
+
+def find_bsprites(source):
+    """
+    Lista os sprites de 'source' como (nome relativo, caminho, entrada no jar).
+    'source' pode ser uma pasta (ex.: recursos extraídos de um JAR) ou o próprio
+    .jar/.zip. A ordem é sempre a mesma, para que a saída seja determinística.
+    """
+    sources = []
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(BSPRITE_EXT):
+                    path = os.path.join(root, name)
+                    sources.append((os.path.relpath(path, source), path, None))
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as jar:
+            for entry in sorted(jar.namelist()):
+                if entry.lower().endswith(BSPRITE_EXT):
+                    sources.append((entry, source, entry))
+    return sources
+
+def _sprite_output_dir(output_root, rel_name):
+    """
+    Pasta de saída de um sprite: caminho relativo sem a extensão .bsprite.
+    Nomes vindos de jars não são confiáveis: barras iniciais e letras de drive
+    são removidas, e um caminho que sairia de output_root ("../..") é recusado.
+    """
+    rel = rel_name.replace("\\", "/")
+    if len(rel) >= 2 and rel[1] == ":":
+        rel = rel[2:]
+    rel = rel.lstrip("/")
+    stem = os.path.normpath(os.path.splitext(rel)[0]) if rel else ""
+
+    root = os.path.abspath(output_root)
+    target = os.path.abspath(os.path.join(root, stem))
+    if target == root or os.path.commonpath([root, target]) != root:
+        raise ValueError(f"Caminho de saída inválido para {rel_name!r}")
+    return os.path.join(output_root, os.path.relpath(target, root))
+
+def extract_sprite_job(job):
+    """
+    Tarefa executada em um processo do pool: carrega um sprite e salva todos os
+    frames como PNG (e as animações, se 'anim_format' for "gif" ou "png").
+    Com 'all_palettes', cada frame é salvo em todas as paletas (frame_NNN_pP.png).
+    Retorna um dicionário com o resultado (para o relatório).
+    """
+    rel_name, path, entry, output_root, anim_format, all_palettes = job
+    started = time.perf_counter()
+    result = {'sprite': rel_name, 'frames': 0, 'failed_frames': 0, 'error': None}
+    try:
+        if entry is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            with zipfile.ZipFile(path) as jar:
+                data = jar.read(entry)
+
+        sprite = parse_bsprite(data, verbose=False)
+        output_dir = _sprite_output_dir(output_root, rel_name)
+        os.makedirs(output_dir, exist_ok=True)
+
+        for i in range(len(sprite.frames)):
+            if all_palettes:
+                images = render_frame_all_palettes(sprite, i)
+                if images:
+                    for p, frame_image in enumerate(images):
+                        frame_image.save(os.path.join(output_dir, f"frame_{i:03d}_p{p}.png"))
+                    result['frames'] += 1
+                else:
+                    result['failed_frames'] += 1
+                continue
+
+            frame_image = render_frame_numpy(sprite, i, palette_index=0)
+            if frame_image:
+                frame_image.save(os.path.join(output_dir, f"frame_{i:03d}.png"))
+                result['frames'] += 1
+            else:
+                result['failed_frames'] += 1
+
+        if anim_format:
+            result['anim_files'] = 0
+            for a in range(len(sprite.anims)):
+                anim_path = os.path.join(output_dir, f"anim_{a:03d}.{anim_format}")
+                if export_animation(sprite, a, anim_path):
+                    result['anim_files'] += 1
+
+        result['modules'] = len(sprite.modules)
+        result['anims'] = len(sprite.anims)
+        result['data_format'] = hex(sprite.data_format)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    return result
+
+def batch_extract(source, output_root="extracted_sprites", workers=None, anim_format=None,
+                  all_palettes=False):
+    """
+    Extrai todos os sprites de 'source' usando 'workers' processos
+    (padrão: número de CPUs) e grava 'summary.json' em 'output_root'.
+    """
+    sources = find_bsprites(source)
+    if not sources:
+        print(f"Nenhum arquivo {BSPRITE_EXT} encontrado em {source}")
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_root, exist_ok=True)
+    print(f"Extraindo {len(sources)} sprites com {workers} processos...")
+
+    started = time.perf_counter()
+    jobs = [(rel_name, path, entry, output_root, anim_format, all_palettes)
+            for rel_name, path, entry in sources]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() preserva a ordem de entrada: o relatório sai sempre igual
+        results = list(pool.map(extract_sprite_job, jobs, chunksize=4))
+    elapsed = time.perf_counter() - started
+
+    errors = [r for r in results if r['error']]
+    summary = {
+        'source': os.path.abspath(source),
+        'workers': workers,
+        'sprites': len(results),
+        'sprites_with_errors': len(errors),
+        'frames': sum(r['frames'] for r in results),
+        'failed_frames': sum(r['failed_frames'] for r in results),
+        'seconds': round(elapsed, 3),
+        'results': results,
+    }
+    with open(os.path.join(output_root, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"Concluído em {elapsed:.1f}s: {summary['frames']} frames de "
+          f"{summary['sprites']} sprites ({len(errors)} com erro).")
+    for r in errors:
+        print(f"  > {r['sprite']}: {r['error']}")
+    return summary
+
+# ==============================================================================
+# 8. ATLAS (SPRITE SHEET)
+#    Empacota frames ou módulos em poucas folhas PNG + manifesto JSON.
 # ==============================================================================
 
+class SkylinePacker:
+    """
+    Empacotador de retângulos "skyline" (bottom-left) para uma folha de
+    tamanho fixo. A linha do horizonte é uma lista de segmentos [x, y, largura].
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.skyline = [[0, 0, width]]
+
+    def _fit(self, index, w, h):
+        """Altura y onde o retângulo cabe a partir do segmento 'index', ou None."""
+        x = self.skyline[index][0]
+        if x + w > self.width:
+            return None
+        y, remaining = 0, w
+        while remaining > 0:
+            if index >= len(self.skyline):
+                return None
+            y = max(y, self.skyline[index][1])
+            if y + h > self.height:
+                return None
+            remaining -= self.skyline[index][2]
+            index += 1
+        return y
+
+    def insert(self, w, h):
+        """Reserva um espaço w x h. Retorna (x, y) ou None se não couber."""
+        best = None
+        for i in range(len(self.skyline)):
+            y = self._fit(i, w, h)
+            if y is not None and (best is None or (y + h, self.skyline[i][0]) < best[0]):
+                best = ((y + h, self.skyline[i][0]), i, y)
+        if best is None:
+            return None
+
+        _, i, y = best
+        x = self.skyline[i][0]
+        self.skyline.insert(i, [x, y + h, w])
+
+        # Encolhe/remove os segmentos cobertos pelo novo retângulo
+        j = i + 1
+        while j < len(self.skyline):
+            seg = self.skyline[j]
+            overlap = x + w - seg[0]
+            if overlap <= 0:
+                break
+            if overlap < seg[2]:
+                seg[0] += overlap
+                seg[2] -= overlap
+                break
+            del self.skyline[j]
+
+        # Junta segmentos vizinhos com a mesma altura
+        j = 0
+        while j < len(self.skyline) - 1:
+            if self.skyline[j][1] == self.skyline[j + 1][1]:
+                self.skyline[j][2] += self.skyline[j + 1][2]
+                del self.skyline[j + 1]
+            else:
+                j += 1
+        return x, y
+
+def pack_rectangles(sizes, max_size=1024, padding=1):
+    """
+    Distribui os retângulos (w, h) em folhas de até max_size x max_size.
+    Retorna (posições [(folha, x, y)], número de folhas). Itens maiores que a
+    folha ganham uma folha própria do tamanho deles.
+    """
+    placements = [None] * len(sizes)
+    packers = []
+    # Maiores primeiro: empacotamento bem mais denso
+    order = sorted(range(len(sizes)), key=lambda k: (-sizes[k][1], -sizes[k][0], k))
+    for k in order:
+        w, h = sizes[k][0] + padding, sizes[k][1] + padding
+        for sheet, packer in enumerate(packers):
+            pos = packer.insert(w, h)
+            if pos:
+                break
+        else:
+            packer = SkylinePacker(max(max_size, w), max(max_size, h))
+            packers.append(packer)
+            sheet, pos = len(packers) - 1, packer.insert(w, h)
+        placements[k] = (sheet, pos[0], pos[1])
+    return placements, len(packers)
+
+def _content_key(indices):
+    """Hash do conteúdo (forma + índices) usado para achar imagens repetidas."""
+    digest = hashlib.blake2b(np.ascontiguousarray(indices).tobytes(), digest_size=16)
+    digest.update(str(indices.shape).encode())
+    return digest.hexdigest()
+
+def export_atlas(sprite, output_dir, name="atlas", mode="frames", palette_index=0,
+                 max_size=1024, padding=1):
+    """
+    Gera '<name>_<n>.png' e '<name>.json' em 'output_dir'.
+    mode = "frames": um retângulo por frame renderizado;
+    mode = "modules": um retângulo por módulo (sem flip/rotação).
+    Imagens idênticas são gravadas uma única vez; as repetições apontam para
+    a primeira ocorrência ('duplicate_of') no manifesto.
+    """
+    if mode == "frames":
+        images = [compose_frame_indices(sprite, i, palette_index) for i in range(len(sprite.frames))]
+    elif mode == "modules":
+        images = [get_module_indices(sprite, i) for i in range(len(sprite.modules))]
+    else:
+        raise ValueError(f"Modo de atlas inválido: {mode}")
+
+    # Deduplicação por conteúdo
+    unique, first_of, entries = [], {}, []
+    for i, indices in enumerate(images):
+        if indices is None or indices.size == 0:
+            entries.append({'index': i, 'empty': True})
+            continue
+        key = _content_key(indices)
+        if key not in first_of:
+            first_of[key] = (i, len(unique))
+            unique.append(indices)
+        entries.append({'index': i, 'unique': first_of[key][1], 'first': first_of[key][0]})
+
+    placements, n_sheets = pack_rectangles([(u.shape[1], u.shape[0]) for u in unique],
+                                           max_size, padding)
+
+    # Folhas como canvas de índices; a paleta é aplicada uma vez por folha
+    extents = [[0, 0] for _ in range(n_sheets)]
+    for (sheet, x, y), u in zip(placements, unique):
+        extents[sheet][0] = max(extents[sheet][0], x + u.shape[1])
+        extents[sheet][1] = max(extents[sheet][1], y + u.shape[0])
+    sheets = [np.full((h, w), TRANSPARENT_INDEX, dtype=np.uint16) for w, h in extents]
+    for (sheet, x, y), u in zip(placements, unique):
+        sheets[sheet][y:y + u.shape[0], x:x + u.shape[1]] = u
+
+    os.makedirs(output_dir, exist_ok=True)
+    lut = palette_lut(sprite, palette_index)
+    sheet_info = []
+    for n, canvas in enumerate(sheets):
+        file_name = f"{name}_{n}.png"
+        Image.fromarray(lut[canvas]).save(os.path.join(output_dir, file_name))
+        sheet_info.append({'file': file_name, 'width': canvas.shape[1], 'height': canvas.shape[0]})
+
+    items = []
+    for entry in entries:
+        if entry.get('empty'):
+            items.append(entry)
+            continue
+        u = entry['unique']
+        sheet, x, y = placements[u]
+        item = {'index': entry['index'], 'sheet': sheet, 'x': x, 'y': y,
+                'w': unique[u].shape[1], 'h': unique[u].shape[0]}
+        if entry['first'] != entry['index']:
+            item['duplicate_of'] = entry['first']
+        if mode == "frames":
+            # Origem do frame (bounding box) para remontar a posição no jogo
+            item['origin_x'], item['origin_y'] = sprite.frames[entry['index']].bounds_rect[:2]
+        items.append(item)
+
+    manifest = {
+        'mode': mode,
+        'palette': palette_index,
+        'unique': len(unique),
+        'total': len(entries),
+        'sheets': sheet_info,
+        mode: items,
+    }
+    with open(os.path.join(output_dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Atlas: {len(unique)} de {len(entries)} {mode} únicos em {n_sheets} folha(s).")
+    return manifest
+
+# ==============================================================================
+# 9. ANIMAÇÕES (GIF / APNG)
+#    Cada AFrame é renderizado sob demanda e gravado no arquivo logo em seguida:
+#    só um quadro fica na memória por vez.
+# ==============================================================================
+
+# Duração de 1 tick de AFrame em ms (~15 FPS, taxa típica dos jogos J2ME)
+ANIM_TICK_MS = 66
+
+def anim_bounds(sprite, anim_index):
+    """
+    Retângulo (x, y, w, h) que contém todos os AFrames da animação, calculado
+    só com os metadados (bounding box do frame + offset do AFrame).
+    """
+    anim = sprite.anims[anim_index]
+    x0 = y0 = None
+    x1 = y1 = 0
+    for af in range(anim.aframe_start_index, anim.aframe_start_index + anim.aframe_count):
+        frame_index, _, offset_x, offset_y, _ = sprite.aframes[af]
+        if frame_index >= len(sprite.frames):
+            continue
+        fx, fy, fw, fh = sprite.frames[frame_index].bounds_rect
+        left, top = fx + offset_x, fy + offset_y
+        x0 = left if x0 is None else min(x0, left)
+        y0 = top if y0 is None else min(y0, top)
+        x1, y1 = max(x1, left + max(fw, 1)), max(y1, top + max(fh, 1))
+    if x0 is None:
+        return (0, 0, 0, 0)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def iter_anim_frames(sprite, anim_index, palette_index=0, ms_per_tick=ANIM_TICK_MS):
+    """
+    Gera (canvas de índices uint16, duração em ms) para cada AFrame, um por vez.
+    Os flags do AFrame (flip X/Y) são aplicados ao frame inteiro como views.
+    """
+    anim = sprite.anims[anim_index]
+    ax, ay, aw, ah = anim_bounds(sprite, anim_index)
+    for af in range(anim.aframe_start_index, anim.aframe_start_index + anim.aframe_count):
+        frame_index, duration, offset_x, offset_y, flags = sprite.aframes[af]
+        canvas = np.full((ah, aw), TRANSPARENT_INDEX, dtype=np.uint16)
+        frame = compose_frame_indices(sprite, frame_index, palette_index)
+        if frame is not None:
+            if flags & FLAG_FLIP_X:
+                frame = frame[:, ::-1]
+            if flags & FLAG_FLIP_Y:
+                frame = frame[::-1, :]
+            fx, fy = sprite.frames[frame_index].bounds_rect[:2]
+            left, top = fx + offset_x - ax, fy + offset_y - ay
+            canvas[top:top + frame.shape[0], left:left + frame.shape[1]] = frame
+        yield canvas, max(duration, 1) * ms_per_tick
+
+def _indexed_palette(sprite, palette_index):
+    """
+    Prepara a paleta para GIF/APNG indexados: (remapeamento uint16 -> uint8,
+    cores RGB [256, 3], alfa [256], índice transparente).
+    """
+    lut = palette_lut(sprite, palette_index)
+    n_colors = min(len(sprite.palettes[palette_index]), 256) if sprite.palettes else 0
+    if n_colors < 256:
+        transparent = n_colors
+    else:
+        free = np.flatnonzero(lut[:256, 3] == 0)
+        if len(free) == 0:
+            raise ValueError("Paleta com 256 cores opacas: não há índice livre para a transparência.")
+        transparent = int(free[0])
+
+    remap = np.arange(TRANSPARENT_INDEX + 1, dtype=np.uint16)
+    remap[TRANSPARENT_INDEX] = transparent
+    remap = remap.astype(np.uint8)
+    alpha = lut[:256, 3].copy()
+    alpha[transparent] = 0
+    return remap, lut[:256, :3], alpha, transparent
+
+def _write_gif(f, frames, width, height, rgb, transparent):
+    """GIF89a em streaming: cabeçalho + paleta global, depois um bloco por quadro."""
+    f.write(b"GIF89a" + struct.pack('<HHBBB', width, height, 0xF7, 0, 0))
+    f.write(rgb.tobytes())
+    # Extensão NETSCAPE2.0: repetir para sempre
+    f.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack('<H', 0) + b"\x00")
+    for indices, duration in frames:
+        im = Image.frombuffer('L', (width, height), indices.tobytes(), 'raw', 'L', 0, 1).convert('P')
+        for chunk in GifImagePlugin.getdata(im, duration=duration, disposal=2,
+                                            transparency=transparent):
+            f.write(chunk)
+    f.write(b";")
+
+def _png_chunk(f, tag, data):
+    f.write(struct.pack('>I', len(data)) + tag + data)
+    f.write(struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+def _write_apng(f, frames, n_frames, width, height, rgb, alpha):
+    """APNG indexado (PLTE + tRNS) em streaming: um fcTL + IDAT/fdAT por quadro."""
+    f.write(b"\x89PNG\r\n\x1a\n")
+    _png_chunk(f, b"IHDR", struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0))
+    _png_chunk(f, b"acTL", struct.pack('>II', n_frames, 0))
+    _png_chunk(f, b"PLTE", rgb.tobytes())
+    _png_chunk(f, b"tRNS", alpha.tobytes())
+
+    sequence = 0
+    for n, (indices, duration) in enumerate(frames):
+        _png_chunk(f, b"fcTL", struct.pack('>IIIIIHHBB', sequence, width, height, 0, 0,
+                                           duration, 1000, 0, 0))
+        sequence += 1
+        # Cada linha começa com o byte de filtro 0 (nenhum)
+        rows = np.zeros((height, width + 1), dtype=np.uint8)
+        rows[:, 1:] = indices
+        data = zlib.compress(rows.tobytes(), 9)
+        if n == 0:
+            _png_chunk(f, b"IDAT", data)
+        else:
+            _png_chunk(f, b"fdAT", struct.pack('>I', sequence) + data)
+            sequence += 1
+    _png_chunk(f, b"IEND", b"")
+
+def export_animation(sprite, anim_index, output_path, palette_index=0, ms_per_tick=ANIM_TICK_MS):
+    """
+    Grava a animação 'anim_index' como GIF (.gif) ou APNG (.png/.apng),
+    conforme a extensão de 'output_path'. Retorna o número de quadros gravados.
+    """
+    anim = sprite.anims[anim_index]
+    _, _, width, height = anim_bounds(sprite, anim_index)
+    if anim.aframe_count == 0 or width == 0 or height == 0:
+        print(f"Aviso: Animação {anim_index} vazia.")
+        return 0
+
+    remap, rgb, alpha, transparent = _indexed_palette(sprite, palette_index)
+    frames = ((remap[canvas], duration)
+              for canvas, duration in iter_anim_frames(sprite, anim_index, palette_index, ms_per_tick))
+
+    with open(output_path, 'wb') as f:
+        if output_path.lower().endswith(".gif"):
+            _write_gif(f, frames, width, height, rgb, transparent)
+        else:
+            _write_apng(f, frames, anim.aframe_count, width, height, rgb, alpha)
+    return anim.aframe_count
+
+# ==============================================================================
+# 10. ÍNDICE DE METADADOS (SQLITE)
+#     Guarda cabeçalho, contagens, formatos e bounding boxes de cada sprite para
+#     consultas rápidas sem reabrir os arquivos. Reexecuções são incrementais.
+# ==============================================================================
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sprites (
+    path              TEXT PRIMARY KEY,
+    mtime             REAL,
+    size              INTEGER,
+    sha256            TEXT,
+    version           INTEGER,
+    flags             INTEGER,
+    n_modules         INTEGER,
+    n_fmodules        INTEGER,
+    n_frames          INTEGER,
+    n_aframes         INTEGER,
+    n_anims           INTEGER,
+    data_format       INTEGER,
+    data_format_name  TEXT,
+    color_format      INTEGER,
+    color_format_name TEXT,
+    n_palettes        INTEGER,
+    n_colors          INTEGER,
+    pixel_bytes       INTEGER,
+    error             TEXT
+);
+CREATE TABLE IF NOT EXISTS frames (
+    path          TEXT,
+    frame_index   INTEGER,
+    fmodule_count INTEGER,
+    x INTEGER, y INTEGER, w INTEGER, h INTEGER,
+    PRIMARY KEY (path, frame_index)
+);
+CREATE INDEX IF NOT EXISTS idx_sprites_format ON sprites (data_format_name);
+CREATE INDEX IF NOT EXISTS idx_sprites_modules ON sprites (n_modules);
+CREATE INDEX IF NOT EXISTS idx_sprites_sha ON sprites (sha256);
+"""
+
+def _index_key(rel_name, path, entry):
+    """Chave do sprite no índice: caminho absoluto (ou 'arquivo.jar!entrada')."""
+    path = os.path.abspath(path)
+    return path if entry is None else f"{path}!{entry}"
+
+def _index_row(key, mtime, size, digest, data):
+    """Linha da tabela 'sprites' + bounding boxes, a partir dos bytes do arquivo."""
+    try:
+        sprite = parse_bsprite(data, verbose=False)
+    except Exception as e:
+        return (key, mtime, size, digest) + (None,) * 14 + (f"{type(e).__name__}: {e}",), []
+
+    n_colors = len(sprite.palettes[0]) if sprite.palettes else 0
+    data_format = _LEGACY_DATA_FORMATS.get(sprite.data_format, sprite.data_format)
+    color_format = _PIXEL_FORMAT_ALIASES.get(sprite.color_format, sprite.color_format)
+    row = (key, mtime, size, digest, sprite.version, sprite.flags,
+           len(sprite.modules), len(sprite.fmodules), len(sprite.frames),
+           len(sprite.aframes), len(sprite.anims),
+           sprite.data_format, DATA_FORMAT_NAMES.get(data_format),
+           sprite.color_format, COLOR_FORMAT_NAMES.get(color_format),
+           len(sprite.palettes), n_colors, sprite.module_offsets[-1], None)
+    frames = [(key, i, fr.fmodule_count) + tuple(fr.bounds_rect)
+              for i, fr in enumerate(sprite.frames)]
+    return row, frames
+
+def index_bsprites(source, db_path="bsprites.db"):
+    """
+    Indexa todos os .bsprite de 'source' (pasta ou .jar) em 'db_path'.
+    Arquivos com mtime e tamanho iguais aos do índice nem são lidos; se mudaram
+    mas o SHA-256 é o mesmo, só o mtime é atualizado. Sprites que sumiram de
+    'source' são removidos do índice.
+    """
+    stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'touched': 0, 'removed': 0, 'errors': 0}
+    db = sqlite3.connect(db_path)
+    jar_cache = {}
+    try:
+        db.executescript(INDEX_SCHEMA)
+        known = {row[0]: row[1:] for row in db.execute("SELECT path, mtime, size, sha256 FROM sprites")}
+        seen = set()
+
+        with db:
+            for rel_name, path, entry in find_bsprites(source):
+                key = _index_key(rel_name, path, entry)
+                seen.add(key)
+                if entry is None:
+                    st = os.stat(path)
+                    mtime, size = st.st_mtime, st.st_size
+                else:
+                    if path not in jar_cache:
+                        jar_cache[path] = zipfile.ZipFile(path)
+                    mtime, size = os.path.getmtime(path), jar_cache[path].getinfo(entry).file_size
+
+                previous = known.get(key)
+                if previous and previous[0] == mtime and previous[1] == size:
+                    stats['unchanged'] += 1
+                    continue
+
+                if entry is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                else:
+                    data = jar_cache[path].read(entry)
+                digest = hashlib.sha256(data).hexdigest()
+
+                if previous and previous[2] == digest:
+                    db.execute("UPDATE sprites SET mtime = ?, size = ? WHERE path = ?", (mtime, size, key))
+                    stats['touched'] += 1
+                    continue
+
+                row, frames = _index_row(key, mtime, size, digest, data)
+                db.execute(f"INSERT OR REPLACE INTO sprites VALUES ({', '.join('?' * len(row))})", row)
+                db.execute("DELETE FROM frames WHERE path = ?", (key,))
+                db.executemany("INSERT INTO frames VALUES (?, ?, ?, ?, ?, ?, ?)", frames)
+                stats['updated' if previous else 'added'] += 1
+                if row[-1]:
+                    stats['errors'] += 1
+
+            # Remove do índice o que não existe mais dentro de 'source'
+            prefix = os.path.abspath(source)
+            for key in known:
+                if key not in seen and (key == prefix or key.startswith(prefix + os.sep)
+                                        or key.startswith(prefix + "!")):
+                    db.execute("DELETE FROM sprites WHERE path = ?", (key,))
+                    db.execute("DELETE FROM frames WHERE path = ?", (key,))
+                    stats['removed'] += 1
+    finally:
+        for jar in jar_cache.values():
+            jar.close()
+        db.close()
+
+    print(f"Índice {db_path}: {stats['added']} novos, {stats['updated']} atualizados, "
+          f"{stats['touched']} só com mtime novo, {stats['unchanged']} sem mudança, "
+          f"{stats['removed']} removidos, {stats['errors']} com erro.")
+    return stats
+
+def query_index(db_path, where="1"):
+    """
+    Lista os sprites do índice que satisfazem a condição SQL 'where', ex.:
+    "n_modules > 200" ou "data_format_name = 'I256RLE'".
+    """
+    db = sqlite3.connect(db_path)
+    try:
+        return db.execute(f"SELECT path, n_modules, n_frames, data_format_name "
+                          f"FROM sprites WHERE {where} ORDER BY path").fetchall()
+    finally:
+        db.close()
+
+# ==============================================================================
+# 11. BENCHMARK
+#     Gera sprites sintéticos (sem precisar de arquivos dos jogos) e mede cada
+#     etapa do pipeline separadamente: load, decode, composite e export.
+# ==============================================================================
+
+def make_synthetic_bsprite(n_modules=200, max_module_size=32, data_format=ENCODE_FORMAT_I256RLE,
+                           n_frames=100, fmodules_per_frame=8, n_palettes=2, n_colors=16,
+                           color_format=PIXEL_FORMAT_8888, seed=0):
+    """
+    Monta um BSprite aleatório (reprodutível pela 'seed') e devolve os bytes do
+    arquivo. Os módulos são feitos de faixas horizontais de cor, para que os
+    formatos RLE tenham sequências parecidas com as de sprites reais.
+    """
+    rng = np.random.default_rng(seed)
+    bits = _PACKED_BITS.get(_LEGACY_DATA_FORMATS.get(data_format, data_format))
+    if bits:
+        n_colors = min(n_colors, 1 << bits)
+    elif data_format == ENCODE_FORMAT_I64RLE:
+        n_colors = min(n_colors, 64)
+    elif data_format == ENCODE_FORMAT_I127RLE:
+        n_colors = min(n_colors, 128)
+
+    sprite = BSprite()
+    sprite.version = 0x03DF
+    sprite.data_format = data_format
+    sprite.color_format = color_format
+
+    colors = rng.integers(0, 256, size=(n_palettes, n_colors, 4), dtype=np.uint8)
+    colors[:, :, 3] = 255
+    colors[:, 0] = 0  # índice 0 transparente
+    sprite.palettes = list(decode_palette_colors(
+        encode_palette_colors(colors, color_format), color_format))
+
+    sizes = rng.integers(1, max_module_size + 1, size=(n_modules, 2))
+    sprite.modules = [(int(w), int(h)) for w, h in sizes]
+    for i, (w, h) in enumerate(sprite.modules):
+        stripes = rng.integers(0, n_colors, size=(h, max(1, w // 4) + 1), dtype=np.uint8)
+        sprite.edited_modules[i] = np.repeat(stripes, 4, axis=1)[:, :w]
+
+    n_fmodules = n_frames * fmodules_per_frame
+    sprite.fmodules = [(int(m), int(x), int(y), int(f)) for m, x, y, f in zip(
+        rng.integers(0, n_modules, n_fmodules), rng.integers(0, 96, n_fmodules),
+        rng.integers(0, 96, n_fmodules), rng.integers(0, 8, n_fmodules))]
+    sprite.frames = [FrameInfo(fmodules_per_frame, i * fmodules_per_frame, (0, 0, 128, 128))
+                     for i in range(n_frames)]
+    sprite.aframes = [(i % min(n_frames, 256), 2, 0, 0, 0) for i in range(n_frames)]
+    sprite.anims = [AnimInfo(min(8, n_frames - a), a) for a in range(0, n_frames, 8)]
+    return serialize_bsprite(sprite)
+
+def _time_stage(func, repeats):
+    """Executa 'func' 'repeats' vezes; retorna estatísticas em segundos."""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return {'min': min(samples), 'median': statistics.median(samples), 'max': max(samples)}
+
+def benchmark_config(repeats=5, **config):
+    """Mede load, decode, composite e export para uma configuração de sprite."""
+    data = make_synthetic_bsprite(**config)
+    sprite = parse_bsprite(data, verbose=False)
+    n_modules, n_frames = len(sprite.modules), len(sprite.frames)
+
+    def decode():
+        for i in range(n_modules):
+            decode_module_indices(sprite, i)
+
+    def composite():
+        sprite.module_cache.clear()
+        for i in range(n_frames):
+            render_frame_numpy(sprite, i)
+
+    def composite_pil():
+        sprite.module_cache.clear()
+        for i in range(n_frames):
+            render_frame_to_image(sprite, i)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.bsprite")
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        def export():
+            for i in range(n_frames):
+                render_frame_numpy(sprite, i).save(os.path.join(tmp, f"frame_{i:03d}.png"))
+
+        stages = {
+            'load': _time_stage(lambda: parse_bsprite(data, verbose=False), repeats),
+            'load_lazy': _time_stage(lambda: load_bsprite(path, True, False).close(), repeats),
+            'decode': _time_stage(decode, repeats),
+            'composite': _time_stage(composite, repeats),
+            'composite_pil': _time_stage(composite_pil, repeats),
+            'export': _time_stage(export, repeats),
+        }
+
+    config['data_format'] = DATA_FORMAT_NAMES.get(config.get('data_format'), config.get('data_format'))
+    return {
+        'config': config,
+        'file_bytes': len(data),
+        'modules': n_modules,
+        'frames': n_frames,
+        'fmodules': len(sprite.fmodules),
+        'stages': stages,
+        'per_module_decode_us': stages['decode']['median'] / max(n_modules, 1) * 1e6,
+        'per_frame_composite_us': stages['composite']['median'] / max(n_frames, 1) * 1e6,
+    }
+
+BENCHMARK_CONFIGS = [
+    dict(data_format=fmt, n_modules=200, max_module_size=32, n_frames=100, fmodules_per_frame=8)
+    for fmt in DATA_FORMAT_NAMES
+] + [
+    dict(data_format=ENCODE_FORMAT_I256RLE, n_modules=250, max_module_size=64,
+         n_frames=1000, fmodules_per_frame=40),
+    dict(data_format=ENCODE_FORMAT_I127RLE, n_modules=255, max_module_size=16,
+         n_frames=200, fmodules_per_frame=200),
+]
+
+def run_benchmarks(output_path=None, repeats=5, configs=None):
+    """Roda todas as configurações e grava/imprime o resultado em JSON."""
+    results = []
+    for config in configs or BENCHMARK_CONFIGS:
+        result = benchmark_config(repeats, **dict(config))
+        results.append(result)
+        st = result['stages']
+        print(f"{result['config']['data_format']:>8} | {result['modules']:4d} mód. "
+              f"{result['fmodules']:6d} fmód. | load {st['load']['median'] * 1e3:7.2f} ms | "
+              f"decode {result['per_module_decode_us']:6.1f} us/mód. | "
+              f"composite {result['per_frame_composite_us']:7.1f} us/frame | "
+              f"export {st['export']['median'] * 1e3:8.1f} ms")
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'repeats': repeats,
+        'results': results,
+    }
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados gravados em {output_path}")
+    return report
+
+# ==============================================================================
+# 12. EXECUÇÃO
+# ==============================================================================
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    options = {a for a in sys.argv[1:] if a.startswith("--")}
+
+    if len(args) < 2:
+        print("Uso:")
+        print('  python "Gameloft Aurora Bsprites.py" extract arquivo.bsprite')
+        print('  python "Gameloft Aurora Bsprites.py" batch <pasta|arquivo.jar> [saida] [processos] [gif|png] [--todas-paletas]')
+        print('  python "Gameloft Aurora Bsprites.py" atlas arquivo.bsprite [saida] [frames|modules]')
+        print('  python "Gameloft Aurora Bsprites.py" anim arquivo.bsprite [saida] [gif|png]')
+        print('  python "Gameloft Aurora Bsprites.py" index <pasta|arquivo.jar> [banco.db]')
+        print('  python "Gameloft Aurora Bsprites.py" query banco.db "n_modules > 200"')
+        print('  python "Gameloft Aurora Bsprites.py" bench resultados.json [repeticoes]')
+        print("\n--- LEMBRETE: O ALGORITMO DE DESCOMPRESSÃO PODE PRECISAR DE AJUSTES ---")
+        return
+
+    mode = args[0]
+
+    if mode == "extract":
+        print(f"Iniciando Extrator BSprite para o arquivo: {args[1]}\n")
+        main_extractor(args[1])
+    elif mode == "batch":
+        output_root = args[2] if len(args) > 2 else "extracted_sprites"
+        workers = int(args[3]) if len(args) > 3 else None
+        anim_format = args[4] if len(args) > 4 else None
+        batch_extract(args[1], output_root, workers, anim_format, "--todas-paletas" in options)
+    elif mode == "atlas":
+        sprite = load_bsprite(args[1])
+        if sprite:
+            output_dir = args[2] if len(args) > 2 else "atlas"
+            atlas_mode = args[3] if len(args) > 3 else "frames"
+            name = os.path.splitext(os.path.basename(args[1]))[0]
+            export_atlas(sprite, output_dir, name, atlas_mode)
+    elif mode == "anim":
+        sprite = load_bsprite(args[1])
+        if sprite:
+            output_dir = args[2] if len(args) > 2 else "animations"
+            anim_format = args[3] if len(args) > 3 else "gif"
+            os.makedirs(output_dir, exist_ok=True)
+            for a in range(len(sprite.anims)):
+                export_animation(sprite, a, os.path.join(output_dir, f"anim_{a:03d}.{anim_format}"))
+            print(f"{len(sprite.anims)} animações exportadas para {output_dir}")
+    elif mode == "index":
+        index_bsprites(args[1], args[2] if len(args) > 2 else "bsprites.db")
+    elif mode == "query":
+        rows = query_index(args[1], args[2] if len(args) > 2 else "1")
+        for path, n_modules, n_frames, data_format_name in rows:
+            print(f"{path}  ({n_modules} módulos, {n_frames} frames, {data_format_name})")
+        print(f"{len(rows)} sprite(s).")
+    elif mode == "bench":
+        run_benchmarks(args[1], int(args[2]) if len(args) > 2 else 5)
+    else:
+        print("Modo inválido. Use extract, batch, atlas, anim, index, query ou bench.")
+
 if __name__ == "__main__":
-    # --- SUBSTITUA 'meu_sprite.bsprite' PELO CAMINHO DO SEU ARQUIVO ---
-    BSPRITE_FILE = "meu_sprite.bsprite" 
-    
-    # Exemplo: main_extractor("data/hero.bsprite")
-    
-    print(f"Iniciando Extrator BSprite para o arquivo: {BSPRITE_FILE}\n")
-    print("--- LEMBRETE: O ALGORITMO DE DESCOMPRESSÃO PODE PRECISAR DE AJUSTES ---")
-    
-    # Substitua a linha abaixo pelo seu arquivo de teste:
-    # main_extractor(BSPRITE_FILE) 
-    
-    # Para fins de demonstração, deixaremos a chamada comentada para evitar erro 
-    # de arquivo não encontrado se você executar o script sem o arquivo.
-    # Se você quiser testar, descomente a linha acima e garanta que o arquivo está no local.
+    main()
@@ -1,12 +1,23 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import struct
+import csv
+import json
+from bisect import bisect_left, bisect_right, insort
 from typing import List, Optional
 import os
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+ENCODINGS = {
+    "UTF-8": "utf-8",
+    "ASCII": "ascii",
+    "Shift_JIS": "shift_jis",
+    "Latin-1": "latin-1"
+}
+MAX_TEXT_LENGTH = 5000  # read_text_block para em 0 ou > 5000
+
 
 class TextEntry:
     def __init__(self, id: int, size_pos: int, position: int, text: str, length: int):
@@ -16,6 +27,7 @@ class TextEntry:
         self.text = text
         self.original_text = text
         self.length = length
+        self.original_length = length  # size_pos/position/original_length: coordenadas do arquivo original
 
 
 class Block:
@@ -25,6 +37,53 @@ class Block:
         self.header = header
         self.texts = texts
         self.size = 4 + sum(2 + t.length for t in texts)
+        self.original_size = self.size  # size - original_size = delta acumulado das edições
+
+
+class PieceTable:
+    # Buffer de edição sobre os bytes originais (imutáveis). Cada edição substitui
+    # um intervalo [start, end) em coordenadas ORIGINAIS; as edições ficam numa
+    # lista ordenada (bisect), sem deslocar nada. O arquivo final só é montado
+    # uma vez, em materialize().
+    def __init__(self, original: bytes):
+        self.original = bytes(original)
+        self.end = len(self.original)   # truncamento (coordenada original)
+        self.starts: List[int] = []     # inícios das edições, ordenados
+        self.edits = {}                 # start -> (end, novos bytes)
+
+    def replace(self, start: int, end: int, data: bytes):
+        if start in self.edits:
+            if self.edits[start][0] != end:
+                raise ValueError(f"Edição sobreposta em 0x{start:X}")
+            self.edits[start] = (end, bytes(data))
+            return
+        i = bisect_right(self.starts, start)
+        if (i > 0 and self.edits[self.starts[i - 1]][0] > start) or \
+           (i < len(self.starts) and self.starts[i] < end):
+            raise ValueError(f"Edição sobreposta em 0x{start:X}")
+        insort(self.starts, start)
+        self.edits[start] = (end, bytes(data))
+
+    def truncate(self, end: int):
+        self.end = end
+
+    @property
+    def modified(self) -> bool:
+        return bool(self.edits) or self.end != len(self.original)
+
+    def materialize(self) -> bytes:
+        view = memoryview(self.original)
+        parts = []
+        cur = 0
+        for start in self.starts:
+            if start >= self.end:
+                break
+            end, data = self.edits[start]
+            parts.append(view[cur:start])
+            parts.append(data)
+            cur = end
+        parts.append(view[cur:self.end])
+        return b"".join(parts)
 
 
 class GameTextEditor(ctk.CTk):
@@ -34,8 +93,11 @@ class GameTextEditor(ctk.CTk):
         self.title("Editor de Textos de Jogos")
         self.geometry("1200x800")
         
-        self.file_data: Optional[bytes] = None
+        self.file_data: Optional[bytes] = None      # bytes originais (não editados)
+        self.text_buffer: Optional[PieceTable] = None  # edições pendentes sobre file_data
         self.blocks: List[Block] = []
+        self.pointers: List[int] = []  # alvos absolutos (originais) de cada entrada da tabela
+        self.table_start = 0           # endereço da tabela usado no último load_texts
         self.current_block: Optional[Block] = None
         self.current_text: Optional[TextEntry] = None
         self.current_encoding = "utf-8"
@@ -76,6 +138,11 @@ class GameTextEditor(ctk.CTk):
                                        height=40, fg_color="#2fa572", hover_color="#248a5e")
         self.btn_load.pack(pady=15, padx=20, fill="x")
         
+        # Botão Importar Traduções (JSON/CSV com bloco, id, texto)
+        self.btn_import = ctk.CTkButton(left_frame, text="📥 Importar Traduções", command=self.import_translations,
+                                         height=40)
+        self.btn_import.pack(pady=(0, 5), padx=20, fill="x")
+        
         # Encoding
         ctk.CTkLabel(left_frame, text="Codificação:").pack(pady=(10,5), padx=20, anchor="w")
         self.encoding_var = ctk.StringVar(value="UTF-8")
@@ -151,7 +218,8 @@ class GameTextEditor(ctk.CTk):
         if file_path:
             try:
                 with open(file_path, 'rb') as f:
-                    self.file_data = bytearray(f.read())
+                    self.file_data = f.read()
+                self.text_buffer = PieceTable(self.file_data)
                 self.file_path = file_path
                 self.lbl_status.configure(text=f"Arquivo carregado:\n{os.path.basename(file_path)}")
                 messagebox.showinfo("Sucesso", "Arquivo aberto com sucesso!")
@@ -166,7 +234,18 @@ class GameTextEditor(ctk.CTk):
         try:
             table_start = int(self.entry_table_start.get().replace("0x", ""), 16)
             num_blocks = int(self.entry_num_blocks.get())
+            
+            # Edições pendentes: monta o arquivo (com os ponteiros recalculados a
+            # partir dos blocos ainda carregados) e passa a usá-lo como original
+            if self.text_buffer is not None and self.text_buffer.modified:
+                errors = self.rebuild_pointers()
+                if errors:
+                    self.show_pointer_errors(errors)
+                    return
+                self.file_data = self.text_buffer.materialize()
+                self.text_buffer = PieceTable(self.file_data)
             self.blocks.clear()
+            self.table_start = table_start
             
             # Ler ponteiros
             pointers = []
@@ -177,6 +256,7 @@ class GameTextEditor(ctk.CTk):
                 ptr = (self.file_data[pos] << 8) | self.file_data[pos + 1]
                 offset = 2 + (2 * i)
                 pointers.append(ptr + offset)
+            self.pointers = pointers
             
             # Ler blocos
             for i in range(len(pointers)):
@@ -266,77 +346,148 @@ class GameTextEditor(ctk.CTk):
         
         new_text = self.text_editor.get("1.0", "end-1c")
         new_bytes = self.string_to_bytes(new_text)
-        old_length = self.current_text.length
-        new_length = len(new_bytes)
-        delta = new_length - old_length
-        text_index = self.current_block.texts.index(self.current_text)
-        
-        if delta != 0:
-            start_of_data = self.current_text.position + old_length
-            bytes_to_move = len(self.file_data) - start_of_data
-            
-            if delta > 0:
-                # Expandir array
-                self.file_data.extend(b'\x00' * delta)
-            
-            # Mover dados
-            self.file_data[start_of_data + delta:start_of_data + delta + bytes_to_move] = \
-                self.file_data[start_of_data:start_of_data + bytes_to_move]
-            
-            # Atualizar posições dos textos seguintes
-            for i in range(text_index + 1, len(self.current_block.texts)):
-                t = self.current_block.texts[i]
-                t.size_pos += delta
-                t.position += delta
-            
-            self.current_block.size += delta
-            self.repoint_subsequent_blocks(self.blocks.index(self.current_block), delta)
-        
-        # Escrever novo tamanho e texto
-        self.file_data[self.current_text.size_pos] = (new_length >> 8) & 0xFF
-        self.file_data[self.current_text.size_pos + 1] = new_length & 0xFF
-        self.file_data[self.current_text.position:self.current_text.position + new_length] = new_bytes
         
-        # Atualizar objeto
-        self.current_text.text = new_text
-        self.current_text.length = new_length
+        if len(new_bytes) > 0xFFFF:
+            messagebox.showerror("Erro", f"Texto grande demais: {len(new_bytes)} bytes")
+            return
         
+        delta = self.write_text(self.current_block, self.current_text, new_text, new_bytes)
         self.update_text_list()
         messagebox.showinfo("Sucesso", f"Aplicado! Delta: {delta:+d} bytes")
     
-    def repoint_subsequent_blocks(self, start_idx: int, delta: int):
-        if len(self.blocks) <= 1:
+    def write_text(self, block: Block, t: TextEntry, new_text: str, new_bytes: bytes) -> int:
+        # Registrar a edição (tamanho + texto) sobre o intervalo original do texto
+        self.text_buffer.replace(t.size_pos, t.position + t.original_length,
+                                 struct.pack('>H', len(new_bytes)) + new_bytes)
+        delta = len(new_bytes) - t.length
+        
+        # Só o delta do bloco; ponteiros são recalculados ao salvar
+        block.size += delta
+        t.text = new_text
+        t.length = len(new_bytes)
+        return delta
+    
+    def read_translation_rows(self, file_path: str) -> list:
+        # Linhas (bloco, id, texto). CSV com cabeçalho block,id,text (ou 3 colunas
+        # sem cabeçalho); JSON como lista de objetos {"block", "id", "text"} ou de listas.
+        if file_path.lower().endswith(".csv"):
+            with open(file_path, newline="", encoding="utf-8-sig") as f:
+                rows = list(csv.reader(f))
+            if rows and [c.strip().lower() for c in rows[0][:3]] == ["block", "id", "text"]:
+                rows = rows[1:]
+        else:
+            with open(file_path, encoding="utf-8-sig") as f:
+                data = json.load(f)
+            rows = [[r.get("block"), r.get("id"), r.get("text")] if isinstance(r, dict) else r
+                    for r in data]
+        return rows
+    
+    def import_translations(self):
+        if not self.blocks:
+            messagebox.showwarning("Aviso", "Carregue os textos primeiro!")
+            return
+        
+        file_path = filedialog.askopenfilename(
+            title="Importar traduções",
+            filetypes=[("JSON / CSV", "*.json *.csv"), ("Todos os arquivos", "*.*")]
+        )
+        if not file_path:
             return
         
         try:
-            table_start = int(self.entry_table_start.get().replace("0x", ""), 16)
-        except:
-            messagebox.showerror("Erro", "Endereço da tabela inválido")
+            rows = self.read_translation_rows(file_path)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao ler arquivo:\n{str(e)}")
+            return
+        
+        # Validar tudo antes de aplicar qualquer linha
+        encoding = ENCODINGS.get(self.current_encoding, "utf-8")
+        errors = []
+        pending = []
+        for n, row in enumerate(rows, 1):
+            try:
+                block_idx, text_id, text = int(row[0]), int(row[1]), str(row[2])
+            except (TypeError, ValueError, IndexError):
+                errors.append(f"Linha {n}: esperado bloco, id, texto")
+                continue
+            if not 0 <= block_idx < len(self.blocks):
+                errors.append(f"Linha {n}: bloco {block_idx} não existe")
+                continue
+            block = self.blocks[block_idx]
+            if not 0 <= text_id < len(block.texts):
+                errors.append(f"Linha {n}: bloco {block_idx} não tem texto #{text_id}")
+                continue
+            try:
+                data = text.encode(encoding)
+            except UnicodeEncodeError as e:
+                errors.append(f"Linha {n}: caractere {text[e.start:e.end]!r} fora de {self.current_encoding}")
+                continue
+            if not 1 <= len(data) <= MAX_TEXT_LENGTH:
+                errors.append(f"Linha {n}: {len(data)} bytes (permitido 1-{MAX_TEXT_LENGTH})")
+                continue
+            pending.append((block, block.texts[text_id], text, data))
+        
+        if errors:
+            lines = errors[:20]
+            if len(errors) > 20:
+                lines.append(f"... e mais {len(errors) - 20}")
+            messagebox.showerror("Erro", f"{len(errors)} linha(s) inválida(s), nada foi aplicado:\n" + "\n".join(lines))
             return
         
-        # Atualizar posições dos blocos
-        for i in range(start_idx + 1, len(self.blocks)):
-            self.blocks[i].position += delta
+        total_delta = 0
+        for block, t, text, data in pending:
+            total_delta += self.write_text(block, t, text, data)
         
-        # Reescrever ponteiros
-        for i in range(start_idx + 1, len(self.blocks)):
-            b = self.blocks[i]
-            offset = 2 + (2 * i)
-            ptr = b.position - offset
-            
+        self.update_text_list()
+        self.lbl_status.configure(text=f"{len(pending)} textos importados\nDelta: {total_delta:+d} bytes")
+        messagebox.showinfo("Sucesso", f"{len(pending)} textos importados! Delta: {total_delta:+d} bytes")
+    
+    def rebuild_pointers(self) -> List[str]:
+        # Recalcula a tabela de ponteiros numa passada (soma de prefixos dos
+        # deltas dos blocos) e grava no text_buffer. Retorna todos os erros.
+        # Todas as entradas são reescritas (inclusive com o valor original, se o
+        # delta voltou a zero), para não sobrar ponteiro de um rebuild anterior.
+        if not self.blocks:
+            return []
+        
+        # shifts[k] = soma dos deltas dos k primeiros blocos (por posição original)
+        ordered = sorted(self.blocks, key=lambda b: b.position)
+        starts = [b.position for b in ordered]
+        shifts = [0]
+        for b in ordered:
+            shifts.append(shifts[-1] + b.size - b.original_size)
+        
+        errors = []
+        new_ptrs = []
+        for i, target in enumerate(self.pointers):
+            shift = shifts[bisect_left(starts, target)]
+            ptr = target + shift - (2 + 2 * i)
             if ptr < 0 or ptr > 0xFFFF:
-                messagebox.showerror("Erro", f"Ponteiro fora do limite: {ptr:04X}")
-                return
-            
-            pos = table_start + i * 2
-            self.file_data[pos] = (ptr >> 8) & 0xFF
-            self.file_data[pos + 1] = ptr & 0xFF
-        
-        # Truncar arquivo
-        if self.blocks:
-            last_block = self.blocks[-1]
-            required_size = last_block.position + last_block.size
-            self.file_data = self.file_data[:required_size]
+                errors.append(f"Bloco {i}: ponteiro fora do limite: {ptr:04X}")
+            else:
+                new_ptrs.append((i, ptr))
+        if errors:
+            return errors
+        
+        for i, ptr in new_ptrs:
+            pos = self.table_start + i * 2
+            self.text_buffer.replace(pos, pos + 2, struct.pack('>H', ptr))
+        
+        # Truncar arquivo (no fim original do último texto do último bloco) só
+        # se algum bloco mudou de tamanho; senão volta ao tamanho original
+        changed = any(b.size != b.original_size for b in self.blocks)
+        if changed and len(self.blocks) > 1:
+            last_text = self.blocks[-1].texts[-1]
+            self.text_buffer.truncate(last_text.position + last_text.original_length)
+        else:
+            self.text_buffer.truncate(len(self.text_buffer.original))
+        return []
+    
+    def show_pointer_errors(self, errors: List[str]):
+        lines = errors[:20]
+        if len(errors) > 20:
+            lines.append(f"... e mais {len(errors) - 20}")
+        messagebox.showerror("Erro", f"{len(errors)} ponteiro(s) fora do limite:\n" + "\n".join(lines))
     
     def reset_text(self):
         if self.current_text:
@@ -355,35 +506,27 @@ class GameTextEditor(ctk.CTk):
         )
         
         if file_path:
+            errors = self.rebuild_pointers()
+            if errors:
+                self.show_pointer_errors(errors)
+                return
             try:
                 with open(file_path, 'wb') as f:
-                    f.write(self.file_data)
+                    f.write(self.text_buffer.materialize())
                 messagebox.showinfo("Sucesso", "Arquivo salvo com sucesso!")
                 self.lbl_status.configure(text=f"Salvo:\n{os.path.basename(file_path)}")
             except Exception as e:
                 messagebox.showerror("Erro", f"Erro ao salvar:\n{str(e)}")
     
     def bytes_to_string(self, data: bytes) -> str:
-        encodings = {
-            "UTF-8": "utf-8",
-            "ASCII": "ascii",
-            "Shift_JIS": "shift_jis",
-            "Latin-1": "latin-1"
-        }
         try:
-            return data.decode(encodings.get(self.current_encoding, "utf-8"))
+            return data.decode(ENCODINGS.get(self.current_encoding, "utf-8"))
         except:
             return data.decode("utf-8", errors="replace")
     
     def string_to_bytes(self, text: str) -> bytes:
-        encodings = {
-            "UTF-8": "utf-8",
-            "ASCII": "ascii",
-            "Shift_JIS": "shift_jis",
-            "Latin-1": "latin-1"
-        }
         try:
-            return text.encode(encodings.get(self.current_encoding, "utf-8"))
+            return text.encode(ENCODINGS.get(self.current_encoding, "utf-8"))
         except:
             return text.encode("utf-8", errors="replace")
     
@@ -6,7 +6,9 @@ Lê e escreve o arquivo 5529.dat (LZMA + tabela de offsets big-endian)
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import struct, lzma, json, copy, os
+import struct, lzma, json, copy, os, sys, time, argparse, threading, queue
+import multiprocessing, unicodedata, hashlib, mmap
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # ─── Constantes ───────────────────────────────────────────────────────────────
 TEXT_BLOCKS = [14, 15, 16, 17, 18, 19, 20, 21, 22]
@@ -23,6 +25,26 @@ BLOCK_NAMES = {
 }
 HEADER_SIZE = 101  # 1 byte count + 25×4 bytes offsets
 N_BLOCKS    = 25
+LZMA_CHUNK  = 1 << 18  # granularidade do progresso/cancelamento (256 KiB)
+# Perfis de compressão. O decoder do celular (sub_29e) só aceita LZMA1 "alone"
+# com lc/lp/pb padrão e aloca o dicionário inteiro: dict_size nunca acima de 8 MiB.
+LZMA_PROFILES = {
+    'fast':    [{'id': lzma.FILTER_LZMA1, 'preset': 1, 'dict_size': 1 << 20}],
+    'default': [{'id': lzma.FILTER_LZMA1, 'preset': 5, 'dict_size': 1 << 23}],
+    'release': [{'id': lzma.FILTER_LZMA1, 'preset': 9, 'dict_size': 1 << 23}],
+    'extreme': [{'id': lzma.FILTER_LZMA1, 'preset': 9 | lzma.PRESET_EXTREME,
+                 'dict_size': 1 << 23}],
+}
+DEFAULT_PROFILE = 'default'
+LZMA_FILTERS = LZMA_PROFILES[DEFAULT_PROFILE]
+POLL_MS     = 50
+ROW_H       = 74   # altura fixa de cada linha da lista virtualizada (px)
+ROW_LINES   = 3    # linhas visíveis no tk.Text de cada linha
+CACHE_DIR   = os.environ.get('DH_CACHE_DIR',
+                             os.path.join(os.path.expanduser('~'), '.cache', 'devilhunter_editor'))
+CACHE_MAX_BYTES = 256 << 20   # acima disso, remove as entradas usadas há mais tempo
+SEARCH_DEBOUNCE_MS = 200  # espera após a última tecla antes de buscar
+MAX_HITS    = 1000  # resultados listados na busca global
 
 # ─── Parse / Build ────────────────────────────────────────────────────────────
 def read_offsets(dec: bytes) -> list[int]:
@@ -55,42 +77,302 @@ def build_block(strings: list[str]) -> bytes:
         parts.append(b)
     return b''.join(parts)
 
-def rebuild(raw_dec: bytes, offsets: list[int], text_blocks: dict) -> bytes:
-    gap = offsets[0] - HEADER_SIZE
-
-    raw_parts = []
-    for i in range(N_BLOCKS - 1):
-        end = offsets[i+1] if i+1 < N_BLOCKS else len(raw_dec)
-        if i in text_blocks:
-            raw_parts.append(build_block(text_blocks[i]))
-        else:
-            raw_parts.append(raw_dec[offsets[i]:end])
-
-    # Calcular novos offsets
+def rebuild(raw_dec: bytes, offsets: list[int], text_blocks: dict,
+            dirty: set | None = None) -> bytes:
+    """
+    Remonta o buffer descomprimido. Só os blocos de texto em 'dirty' são
+    recodificados (todos, se dirty=None); os demais reaproveitam os bytes
+    originais. A tabela de offsets é corrigida somando o delta acumulado, e o
+    resultado é montado com fatias memoryview de raw_dec (uma única cópia).
+    """
+    src = memoryview(raw_dec)
+    parts = [None, src[HEADER_SIZE:offsets[0]]]   # header (abaixo) + gap preservado
     new_offs = []
-    cur = HEADER_SIZE + gap
-    for blk in raw_parts:
-        new_offs.append(cur)
-        cur += len(blk)
-    new_offs.append(cur)  # end marker
+    delta = 0
+    clean_start = None   # início de uma sequência de blocos inalterados
 
-    # Montar buffer final
-    result = bytearray(cur)
-    result[0] = raw_dec[0]  # 0x19
-
-    for i in range(N_BLOCKS):
-        o = 1 + i * 4
-        result[o:o+4] = struct.pack('>I', new_offs[i])
-
-    # Gap preservado
-    result[HEADER_SIZE:HEADER_SIZE+gap] = raw_dec[HEADER_SIZE:HEADER_SIZE+gap]
+    for i in range(N_BLOCKS - 1):
+        new_offs.append(offsets[i] + delta)
+        if i in text_blocks and (dirty is None or i in dirty):
+            if clean_start is not None:
+                parts.append(src[clean_start:offsets[i]])
+                clean_start = None
+            blk = build_block(text_blocks[i])
+            delta += len(blk) - (offsets[i+1] - offsets[i])
+            parts.append(blk)
+        elif clean_start is None:
+            clean_start = offsets[i]
+    if clean_start is not None:
+        parts.append(src[clean_start:offsets[N_BLOCKS-1]])
+    new_offs.append(offsets[N_BLOCKS-1] + delta)  # end marker
+
+    parts[0] = raw_dec[:1] + struct.pack(f'>{N_BLOCKS}I', *new_offs)  # 0x19 + offsets
+    return b''.join(parts)
 
-    wp = HEADER_SIZE + gap
-    for blk in raw_parts:
-        result[wp:wp+len(blk)] = blk
-        wp += len(blk)
+def parse_text_blocks(dec: bytes, offsets: list[int]) -> dict:
+    return {bi: parse_block(dec[offsets[bi]:offsets[bi+1]]) for bi in TEXT_BLOCKS}
+
+def load_translation(path: str, text_blocks: dict) -> tuple[int, set]:
+    """
+    Aplica um JSON no formato do Export JSON (block_N → strings) em text_blocks.
+    Retorna (blocos aplicados, conjunto dos blocos que de fato mudaram).
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    count, changed = 0, set()
+    for key, val in data.items():
+        bi = int(key.replace('block_', ''))
+        if bi in text_blocks and isinstance(val.get('strings'), list):
+            if val['strings'] != text_blocks[bi]:
+                changed.add(bi)
+            text_blocks[bi] = val['strings']
+            count += 1
+    return count, changed
+
+# ─── Índice de busca ──────────────────────────────────────────────────────────
+class SearchIndex:
+    """
+    Cópia pré-normalizada (minúsculas e, opcionalmente, sem acentos) das strings
+    atuais e originais de todos os blocos de texto. A busca compara só contra o
+    índice; edições atualizam a entrada correspondente com update().
+    """
+
+    def __init__(self, accents: bool = False):
+        self.accents = accents   # True: 'ação' casa com 'acao'
+        self.cur  = {}
+        self.orig = {}
+
+    def fold(self, s: str) -> str:
+        s = s.lower()
+        if self.accents:
+            s = ''.join(c for c in unicodedata.normalize('NFKD', s)
+                        if not unicodedata.combining(c))
+        return s
+
+    def build(self, text_blocks: dict, orig_blocks: dict):
+        self.cur  = {bi: [self.fold(s) for s in v] for bi, v in text_blocks.items()}
+        self.orig = {bi: [self.fold(s) for s in v] for bi, v in orig_blocks.items()}
+
+    def update(self, bi: int, idx: int, value: str):
+        self.cur[bi][idx] = self.fold(value)
+
+    def match(self, bi: int, idx: int, query: str) -> bool:
+        """query já normalizada com fold()."""
+        if query in self.cur[bi][idx]:
+            return True
+        orig = self.orig.get(bi, [])
+        return idx < len(orig) and query in orig[idx]
+
+    def search(self, query: str) -> list[tuple[int, int]]:
+        return [(bi, idx) for bi in TEXT_BLOCKS if bi in self.cur
+                for idx in range(len(self.cur[bi])) if self.match(bi, idx, query)]
+
+# ─── Lista virtualizada ───────────────────────────────────────────────────────
+class _StringRow:
+    """Widgets de uma linha reciclável e a string (bloco, índice) que ela mostra."""
+    __slots__ = ('frame', 'lbl_idx', 'ta', 'lbl_bytes', 'key')
 
-    return bytes(result)
+    def __init__(self):
+        self.key = None
+
+# ─── LZMA (executado fora da thread da UI) ────────────────────────────────────
+class Cancelled(Exception):
+    """Operação cancelada pelo usuário."""
+
+def _lzma_feed(codec, data: bytes, progress=None, cancel=None, flush=False) -> bytes:
+    """Passa 'data' pelo (de)compressor em blocos, reportando progresso (0..1)."""
+    out = []
+    view = memoryview(data)
+    total = max(len(view), 1)
+    for pos in range(0, len(view), LZMA_CHUNK):
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        out.append(codec.compress(view[pos:pos+LZMA_CHUNK]) if flush
+                   else codec.decompress(view[pos:pos+LZMA_CHUNK]))
+        if progress:
+            progress(min(pos + LZMA_CHUNK, total) / total)
+        if not flush and codec.eof:
+            break
+    if flush:
+        out.append(codec.flush())
+    elif not codec.eof:
+        raise lzma.LZMAError('Stream LZMA truncado')
+    return b''.join(out)
+
+def decompress_dat(buf: bytes, progress=None, cancel=None) -> bytes:
+    """Arquivo .dat (4 bytes de tamanho BE + stream LZMA) -> buffer descomprimido."""
+    if len(buf) < 17:
+        raise ValueError('Arquivo muito pequeno')
+    stream = memoryview(buf)[4:]
+    try:
+        return _lzma_feed(lzma.LZMADecompressor(), stream, progress, cancel)
+    except lzma.LZMAError:
+        return _lzma_feed(lzma.LZMADecompressor(format=lzma.FORMAT_ALONE),
+                          stream, progress, cancel)
+
+class DatStream:
+    """
+    Descompressão incremental do .dat. read_until(n) só avança o
+    LZMADecompressor até ter n bytes de saída (max_length), então dá para ler
+    o header e os blocos de texto sem descomprimir o resto; read_all() termina
+    o stream quando ele for necessário (ao salvar).
+    """
+
+    def __init__(self, buf: bytes):
+        if len(buf) < 17:
+            raise ValueError('Arquivo muito pequeno')
+        self._src = memoryview(buf)[4:]
+        self._pos = 0
+        self._dec = lzma.LZMADecompressor()
+        self._auto = True     # cai para FORMAT_ALONE se o AUTO recusar o header
+        self.data = bytearray()
+
+    @property
+    def complete(self) -> bool:
+        return self._dec.eof
+
+    def read_until(self, n: int, progress=None, cancel=None) -> bytearray:
+        """Garante pelo menos n bytes descomprimidos (ou o stream inteiro)."""
+        while len(self.data) < n and not self._dec.eof:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            chunk = b''
+            if self._dec.needs_input:
+                chunk = self._src[self._pos:self._pos+LZMA_CHUNK]
+                if not chunk:
+                    raise lzma.LZMAError('Stream LZMA truncado')
+            try:
+                out = self._dec.decompress(chunk, max_length=n - len(self.data))
+            except lzma.LZMAError:
+                if not (self._auto and self._pos == 0):
+                    raise
+                self._auto = False
+                self._dec = lzma.LZMADecompressor(format=lzma.FORMAT_ALONE)
+                continue
+            self._pos += len(chunk)
+            self.data += out
+            if progress:
+                progress(min(len(self.data) / max(n, 1), 1.0))
+        return self.data
+
+    def read_all(self, progress=None, cancel=None) -> bytes:
+        while not self._dec.eof:
+            self.read_until(len(self.data) + LZMA_CHUNK, cancel=cancel)
+            if progress:
+                progress(self._pos / max(len(self._src), 1))
+        return bytes(self.data)
+
+def compress_dat(new_dec: bytes, progress=None, cancel=None,
+                 profile: str = DEFAULT_PROFILE) -> bytes:
+    """Buffer descomprimido -> conteúdo completo do .dat, pronto para gravar."""
+    filters = LZMA_PROFILES[profile]
+    comp = _lzma_feed(lzma.LZMACompressor(format=lzma.FORMAT_ALONE, filters=filters),
+                      new_dec, progress, cancel, flush=True)
+
+    # CRÍTICO: o Python gera bytes 5-12 do header LZMA como 0xFFFFFFFFFFFFFFFF
+    # (tamanho desconhecido). O decoder do jogo (sub_29e) lê esses bytes como
+    # o tamanho do buffer a alocar — com 0xFF...FF ele trava/freeze por OOM.
+    # Fix: patchear bytes 5-8 com o tamanho real descomprimido (LE 4 bytes)
+    # e zerar bytes 9-12, exatamente como no arquivo original.
+    comp = bytearray(comp)
+    comp[5:9]  = struct.pack('<I', len(new_dec))
+    comp[9:13] = b'\x00\x00\x00\x00'
+
+    return struct.pack('>I', len(comp)) + bytes(comp)
+
+# ─── Cache em disco ───────────────────────────────────────────────────────────
+def dat_key(buf: bytes) -> str:
+    """Chave do cache: SHA-256 do stream LZMA (sem os 4 bytes de tamanho)."""
+    return hashlib.sha256(memoryview(buf)[4:]).hexdigest()
+
+class DatCache:
+    """
+    Cache de .dat já descomprimidos, indexado pelo hash do stream comprimido.
+    Cada entrada tem <hash>.json (offsets + strings dos blocos de texto) e,
+    quando o buffer completo já foi descomprimido, <hash>.bin. O mtime marca o
+    último uso; evict() apaga as entradas mais antigas até caber em max_bytes.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key + ext)
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str, use_mmap: bool = True):
+        """-> (offsets, blocks, buffer ou None), ou None se não houver entrada."""
+        meta_path, bin_path = self._path(key, '.json'), self._path(key, '.bin')
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            offsets = meta['offsets']
+            blocks = {int(k): v for k, v in meta['blocks'].items()}
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        dec = None
+        try:
+            if os.path.getsize(bin_path) == meta.get('size'):
+                with open(bin_path, 'rb') as f:
+                    if use_mmap:
+                        dec = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    else:
+                        dec = f.read()
+                os.utime(bin_path)
+        except (OSError, ValueError):
+            dec = None
+        return offsets, blocks, dec
+
+    def put(self, key: str, offsets: list[int], blocks: dict, dec: bytes | None = None):
+        """Grava a entrada; dec (buffer completo) é opcional e pode vir depois."""
+        meta = {'offsets': offsets,
+                'blocks': {str(bi): v for bi, v in blocks.items()},
+                'size': len(dec) if dec is not None else None}
+        if dec is not None:
+            self._write(self._path(key, '.bin'), dec)
+        elif os.path.exists(self._path(key, '.bin')):
+            meta['size'] = os.path.getsize(self._path(key, '.bin'))
+        self._write(self._path(key, '.json'),
+                    json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        self.evict()
+
+    def evict(self):
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        entries = {}   # key -> [tamanho total, mtime mais recente]
+        for name in names:
+            key, ext = os.path.splitext(name)
+            if ext not in ('.json', '.bin'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, name))
+            except OSError:
+                continue
+            e = entries.setdefault(key, [0, 0.0])
+            e[0] += st.st_size
+            e[1] = max(e[1], st.st_mtime)
+
+        total = sum(e[0] for e in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_bytes:
+                break
+            for ext in ('.bin', '.json'):
+                try:
+                    os.remove(self._path(key, ext))
+                except OSError:   # inexistente, ou ainda mapeado (Windows)
+                    pass
+            total -= size
 
 # ─── Janela principal ─────────────────────────────────────────────────────────
 class DevilHunterEditor(tk.Tk):
@@ -106,9 +388,25 @@ class DevilHunterEditor(tk.Tk):
         self.offsets     = []
         self.text_blocks = {}
         self.orig_blocks = {}
+        self.dirty_blocks = set()   # blocos editados desde a abertura do arquivo
         self.cur_block   = None
         self.dat_path    = None
-        self.row_widgets = []   # lista de (orig_str, StringVar, label_bytes)
+        self.dat_stream  = None   # DatStream ainda não terminado (leitura parcial)
+        self.dat_key     = None   # SHA-256 do stream aberto (chave do cache)
+        self.cache       = DatCache()
+        self.row_pool    = []   # linhas recicladas da lista virtualizada
+        self.visible_idx = []   # índices (no bloco atual) que passam no filtro
+        self._scroll_px  = 0
+        self.search_index = SearchIndex()
+        self._search_job = None   # after() pendente da busca (debounce)
+        self._hits       = []     # (bloco, índice) listados na busca global
+
+        # Tarefa em segundo plano (LZMA): thread + fila lida via after()
+        self._task_queue    = queue.Queue()
+        self._task_cancel   = None
+        self._task_progress = 0.0
+        self._task_label    = ''
+        self._task_done     = None
 
         self._build_ui()
 
@@ -157,6 +455,25 @@ class DevilHunterEditor(tk.Tk):
         for btn in (self.btn_open, self.btn_save, self.btn_exp, self.btn_imp, self.btn_rst):
             btn.pack(side='left', padx=2)
 
+        self.partial_load = tk.BooleanVar(value=True)
+        tk.Checkbutton(hdr, text='leitura parcial', variable=self.partial_load,
+                       bg='#111111', fg='#666666', selectcolor='#222222',
+                       activebackground='#111111', activeforeground='#aaaaaa',
+                       font=('Consolas', 9)).pack(side='left', padx=(10, 0))
+
+        ttk.Label(hdr, text='LZMA:', style='Header.TLabel',
+                  font=('Consolas', 9)).pack(side='left', padx=(10, 2))
+        self.profile_var = tk.StringVar(value=DEFAULT_PROFILE)
+        self.cmb_profile = ttk.Combobox(hdr, textvariable=self.profile_var,
+                                        values=list(LZMA_PROFILES), width=8,
+                                        state='readonly')
+        self.cmb_profile.pack(side='left', padx=2)
+
+        self.btn_cancel = ttk.Button(hdr, text='Cancelar', command=self.cancel_task,
+                                     style='Danger.TButton')
+        self.progress = ttk.Progressbar(hdr, orient='horizontal', length=140,
+                                        mode='determinate', maximum=100)
+
         self.lbl_status = ttk.Label(hdr, text='Aguardando arquivo...',
                                     foreground='#555555', background='#111111',
                                     font=('Consolas', 9))
@@ -204,7 +521,7 @@ class DevilHunterEditor(tk.Tk):
         ttk.Label(toolbar2, text='Buscar:', style='Sidebar.TLabel',
                   background='#111111').pack(side='left')
         self.search_var = tk.StringVar()
-        self.search_var.trace_add('write', lambda *_: self.render_strings())
+        self.search_var.trace_add('write', lambda *_: self._schedule_search())
         search_entry = tk.Entry(toolbar2, textvariable=self.search_var,
                                 bg='#1a1a1a', fg='#cccccc', insertbackground='#e8a020',
                                 relief='flat', font=('Consolas', 10), width=24,
@@ -220,33 +537,42 @@ class DevilHunterEditor(tk.Tk):
                              font=('Consolas', 9))
         chk.pack(side='left')
 
+        self.search_all = tk.BooleanVar()
+        self.fold_accents = tk.BooleanVar()
+        for text, var, cmd in (('todos os blocos', self.search_all, self._run_search),
+                               ('ignorar acentos', self.fold_accents, self._on_fold_toggle)):
+            tk.Checkbutton(toolbar2, text=text, variable=var, command=cmd,
+                           bg='#111111', fg='#666666', selectcolor='#222222',
+                           activebackground='#111111', activeforeground='#aaaaaa',
+                           font=('Consolas', 9)).pack(side='left', padx=(8, 0))
+
         self.lbl_count = tk.Label(toolbar2, text='', bg='#111111',
                                   fg='#444444', font=('Consolas', 9))
         self.lbl_count.pack(side='right', padx=6)
 
         tk.Frame(panel, bg='#2a2a2a', height=1).pack(fill='x')
 
-        # Strings list
-        self.strings_canvas = tk.Canvas(panel, bg='#1a1a1a', highlightthickness=0)
-        str_scroll = ttk.Scrollbar(panel, orient='vertical',
-                                   command=self.strings_canvas.yview)
-        self.strings_canvas.configure(yscrollcommand=str_scroll.set)
-        str_scroll.pack(side='right', fill='y')
-        self.strings_canvas.pack(fill='both', expand=True)
-
-        self.strings_frame = tk.Frame(self.strings_canvas, bg='#1a1a1a')
-        self._str_win = self.strings_canvas.create_window(
-            (0, 0), window=self.strings_frame, anchor='nw')
-        self.strings_frame.bind('<Configure>', self._on_strings_frame_resize)
-        self.strings_canvas.bind('<Configure>', self._on_canvas_resize)
-
-        # Mouse wheel
-        self.strings_canvas.bind('<MouseWheel>',
-            lambda e: self.strings_canvas.yview_scroll(-1*(e.delta//120), 'units'))
-        self.strings_canvas.bind('<Button-4>',
-            lambda e: self.strings_canvas.yview_scroll(-1, 'units'))
-        self.strings_canvas.bind('<Button-5>',
-            lambda e: self.strings_canvas.yview_scroll(1, 'units'))
+        # Resultados da busca global (só aparece com 'todos os blocos' + termo)
+        self.results_frame = tk.Frame(panel, bg='#111111')
+        hits_scroll = ttk.Scrollbar(self.results_frame, orient='vertical')
+        self.lst_hits = tk.Listbox(self.results_frame, height=7, bg='#131313', fg='#aaaaaa',
+                                   selectbackground='#3a2800', selectforeground='#e8a020',
+                                   relief='flat', highlightthickness=0, activestyle='none',
+                                   font=('Consolas', 9), yscrollcommand=hits_scroll.set)
+        hits_scroll.configure(command=self.lst_hits.yview)
+        hits_scroll.pack(side='right', fill='y')
+        self.lst_hits.pack(fill='x', padx=6, pady=4)
+        self.lst_hits.bind('<Double-Button-1>', lambda e: self._jump_to_hit())
+        self.lst_hits.bind('<Return>',          lambda e: self._jump_to_hit())
+
+        # Strings list (virtualizada: só as linhas visíveis existem como widgets)
+        self.str_scroll = ttk.Scrollbar(panel, orient='vertical',
+                                        command=self._on_scrollbar)
+        self.str_scroll.pack(side='right', fill='y')
+        self.list_frame = tk.Frame(panel, bg='#1a1a1a')
+        self.list_frame.pack(fill='both', expand=True)
+        self.list_frame.bind('<Configure>', lambda e: self._layout_rows())
+        self._bind_wheel(self.list_frame)
 
         # Drop zone (antes do workspace)
         self.drop_frame = tk.Frame(self, bg='#1a1a1a')
@@ -269,11 +595,10 @@ class DevilHunterEditor(tk.Tk):
             pass
         self.bind('<Key-o>', lambda e: self.open_dat())
 
-    def _on_strings_frame_resize(self, event):
-        self.strings_canvas.configure(scrollregion=self.strings_canvas.bbox('all'))
-
-    def _on_canvas_resize(self, event):
-        self.strings_canvas.itemconfig(self._str_win, width=event.width)
+    @property
+    def loaded(self) -> bool:
+        # Com leitura parcial + cache, raw_dec pode ser None com o arquivo aberto
+        return bool(self.offsets)
 
     # ── Status ────────────────────────────────────────────────────────────────
     def set_status(self, msg, state='normal'):
@@ -289,34 +614,124 @@ class DevilHunterEditor(tk.Tk):
         if path:
             self._load_dat(path)
 
-    def _load_dat(self, path):
-        self.set_status('Lendo arquivo...', 'busy')
+    # ── Tarefas em segundo plano ─────────────────────────────────────────────
+    def _run_task(self, label, func, on_done):
+        """
+        Executa func(progress, cancel) numa thread. O resultado volta para a
+        thread da UI pelo polling com after(); on_done(result) roda na UI.
+        """
+        if self._task_cancel is not None:
+            self.set_status('Aguarde a operação em andamento...', 'busy')
+            return
+        self._task_cancel   = threading.Event()
+        self._task_progress = 0.0
+        self._task_label    = label
+        self._task_done     = on_done
+
+        for btn in (self.btn_open, self.btn_save, self.btn_exp, self.btn_imp, self.btn_rst):
+            btn.configure(state='disabled')
+        self.progress.configure(value=0)
+        self.btn_cancel.pack(side='right', padx=4)
+        self.progress.pack(side='right', padx=4)
+        self.set_status(label, 'busy')
+
+        def worker(cancel=self._task_cancel):
+            def progress(frac):
+                self._task_progress = frac
+            try:
+                self._task_queue.put(('ok', func(progress, cancel)))
+            except Cancelled:
+                self._task_queue.put(('cancel', None))
+            except Exception as e:
+                self._task_queue.put(('err', e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(POLL_MS, self._poll_task)
+
+    def _poll_task(self):
         try:
-            with open(path, 'rb') as f:
-                buf = f.read()
+            kind, result = self._task_queue.get_nowait()
+        except queue.Empty:
+            pct = self._task_progress * 100
+            self.progress.configure(value=pct)
+            self.set_status(f'{self._task_label} {pct:.0f}%', 'busy')
+            self.after(POLL_MS, self._poll_task)
+            return
+
+        on_done = self._task_done
+        self._task_cancel = None
+        self._task_done   = None
+        self.progress.pack_forget()
+        self.btn_cancel.pack_forget()
+        self.btn_open.configure(state='normal')
+        if self.loaded:
+            for btn in (self.btn_save, self.btn_exp, self.btn_imp, self.btn_rst):
+                btn.configure(state='normal')
 
-            if len(buf) < 17:
-                raise ValueError('Arquivo muito pequeno')
+        if kind == 'ok':
+            on_done(result)
+        elif kind == 'cancel':
+            self.set_status('Operação cancelada', 'normal')
+        else:
+            self.set_status(f'Erro: {result}', 'err')
+            messagebox.showerror('Erro', str(result))
 
-            size_be = struct.unpack('>I', buf[:4])[0]
-            stream  = buf[4:]
+    def cancel_task(self):
+        if self._task_cancel is not None:
+            self._task_cancel.set()
+            self.set_status('Cancelando...', 'busy')
 
-            self.set_status('Descomprimindo LZMA...', 'busy')
+    def _load_dat(self, path):
+        partial = self.partial_load.get()
+        cache   = self.cache
+
+        def task(progress, cancel):
+            with open(path, 'rb') as f:
+                buf = f.read()
+            key = dat_key(buf)
+
+            hit = cache.get(key)
+            if hit is not None:
+                offsets, blocks, dec = hit
+                if dec is not None:
+                    return key, dec, offsets, blocks, None
+                if partial:   # só as strings: o stream fica para o save
+                    return key, None, offsets, blocks, DatStream(buf)
+
+            if partial:
+                # Só header + blocos de texto: para no fim do último bloco editável
+                stream = DatStream(buf)
+                head = stream.read_until(HEADER_SIZE, cancel=cancel)
+                end = read_offsets(head)[TEXT_BLOCKS[-1] + 1]
+                dec = bytes(stream.read_until(end, progress, cancel))
+                if stream.complete:
+                    stream = None
+            else:
+                dec, stream = decompress_dat(buf, progress, cancel), None
+
+            offsets = read_offsets(dec)
+            blocks = parse_text_blocks(dec, offsets)
             try:
-                dec = lzma.decompress(stream)
-            except lzma.LZMAError:
-                dec = lzma.decompress(stream, format=lzma.FORMAT_ALONE)
+                cache.put(key, offsets, blocks, None if stream else dec)
+            except OSError:
+                pass   # cache é só otimização
+            return key, dec, offsets, blocks, stream
+
+        self._run_task('Descomprimindo LZMA...', task,
+                       lambda res: self._apply_loaded(path, *res))
 
+    def _apply_loaded(self, path, key, dec, offsets, blocks, stream=None):
+        try:
             self.raw_dec  = dec
-            self.offsets  = read_offsets(dec)
+            self.dat_stream = stream
+            self.dat_key  = key
+            self.offsets  = offsets
             self.dat_path = path
-            self.text_blocks = {}
-            for bi in TEXT_BLOCKS:
-                start = self.offsets[bi]
-                end   = self.offsets[bi+1] if bi+1 < N_BLOCKS else len(dec)
-                self.text_blocks[bi] = parse_block(dec[start:end])
+            self.text_blocks = blocks
 
             self.orig_blocks = copy.deepcopy(self.text_blocks)
+            self.dirty_blocks = set()
+            self.search_index.build(self.text_blocks, self.orig_blocks)
 
             self.drop_frame.place_forget()
             for btn in (self.btn_save, self.btn_exp, self.btn_imp, self.btn_rst):
@@ -342,37 +757,35 @@ class DevilHunterEditor(tk.Tk):
         if not path:
             return
 
-        self.set_status('Reconstruindo buffer...', 'busy')
-        try:
-            new_dec = rebuild(self.raw_dec, self.offsets, self.text_blocks)
-
-            self.set_status('Comprimindo LZMA (aguarde)...', 'busy')
-            comp = lzma.compress(new_dec, format=lzma.FORMAT_ALONE,
-                                 filters=[{'id': lzma.FILTER_LZMA1,
-                                           'preset': 5,
-                                           'dict_size': 1 << 23}])
-
-            # CRÍTICO: o Python gera bytes 5-12 do header LZMA como 0xFFFFFFFFFFFFFFFF
-            # (tamanho desconhecido). O decoder do jogo (sub_29e) lê esses bytes como
-            # o tamanho do buffer a alocar — com 0xFF...FF ele trava/freeze por OOM.
-            # Fix: patchear bytes 5-8 com o tamanho real descomprimido (LE 4 bytes)
-            # e zerar bytes 9-12, exatamente como no arquivo original.
-            comp = bytearray(comp)
-            comp[5:9]  = struct.pack('<I', len(new_dec))
-            comp[9:13] = b'\x00\x00\x00\x00'
-            comp = bytes(comp)
-
-            size_be = struct.pack('>I', len(comp))
-            out = size_be + comp
-
+        profile = self.profile_var.get()
+        stream  = self.dat_stream
+        raw_dec = self.raw_dec
+        # Cópia rasa: a thread não pode ver edições feitas durante a compressão
+        blocks  = {bi: list(v) for bi, v in self.text_blocks.items()}
+        dirty   = set(self.dirty_blocks)
+        key, offsets, orig = self.dat_key, self.offsets, self.orig_blocks
+
+        def task(progress, cancel):
+            if stream is not None:   # leitura parcial: descomprime o resto agora
+                raw_dec_full = stream.read_all(progress, cancel)
+                try:
+                    self.cache.put(key, offsets, orig, raw_dec_full)
+                except OSError:
+                    pass
+            else:
+                raw_dec_full = raw_dec
+            new_dec = rebuild(raw_dec_full, offsets, blocks, dirty)
+            out = compress_dat(new_dec, progress, cancel, profile)
             with open(path, 'wb') as f:
                 f.write(out)
+            return len(out), raw_dec_full
 
-            self.set_status(f'Salvo! {len(out)} bytes → {os.path.basename(path)}', 'ok')
+        def done(res):
+            size, self.raw_dec = res
+            self.dat_stream = None
+            self.set_status(f'Salvo! {size} bytes → {os.path.basename(path)}', 'ok')
 
-        except Exception as e:
-            self.set_status(f'Erro ao salvar: {e}', 'err')
-            messagebox.showerror('Erro ao salvar', str(e))
+        self._run_task(f'Comprimindo LZMA ({profile})...', task, done)
 
     def export_json(self):
         path = filedialog.asksaveasfilename(
@@ -399,16 +812,11 @@ class DevilHunterEditor(tk.Tk):
         if not path:
             return
         try:
-            with open(path, encoding='utf-8') as f:
-                data = json.load(f)
-            count = 0
-            for key, val in data.items():
-                bi = int(key.replace('block_', ''))
-                if bi in self.text_blocks and isinstance(val.get('strings'), list):
-                    self.text_blocks[bi] = val['strings']
-                    count += 1
+            count, changed = load_translation(path, self.text_blocks)
+            self.dirty_blocks |= changed
+            self.search_index.build(self.text_blocks, self.orig_blocks)
             self._build_sidebar()
-            self.render_strings()
+            self._run_search()
             self.set_status(f'JSON importado · {count} blocos', 'ok')
         except Exception as e:
             self.set_status(f'Erro no JSON: {e}', 'err')
@@ -418,8 +826,10 @@ class DevilHunterEditor(tk.Tk):
         if not messagebox.askyesno('Resetar', 'Resetar todas as strings para o original?'):
             return
         self.text_blocks = copy.deepcopy(self.orig_blocks)
+        self.dirty_blocks = set()
+        self.search_index.build(self.text_blocks, self.orig_blocks)
         self._build_sidebar()
-        self.render_strings()
+        self._run_search()
         self.set_status('Resetado para original', 'ok')
 
     # ── Sidebar ───────────────────────────────────────────────────────────────
@@ -473,75 +883,200 @@ class DevilHunterEditor(tk.Tk):
 
     # ── Strings panel ─────────────────────────────────────────────────────────
     def render_strings(self):
+        """Refaz o filtro sobre o modelo e redesenha só as linhas visíveis."""
         if self.cur_block is None:
             return
 
-        for w in self.strings_frame.winfo_children():
-            w.destroy()
-        self.row_widgets = []
-
-        strings = self.text_blocks.get(self.cur_block, [])
-        orig    = self.orig_blocks.get(self.cur_block, [])
-        search  = self.search_var.get().lower()
+        bi      = self.cur_block
+        strings = self.text_blocks.get(bi, [])
+        orig    = self.orig_blocks.get(bi, [])
+        search  = self.search_index.fold(self.search_var.get())
         only_mod= self.only_mod.get()
-        shown   = 0
 
+        visible = []
         for idx, s in enumerate(strings):
-            orig_s = orig[idx] if idx < len(orig) else ''
-            mod    = s != orig_s
-            if only_mod and not mod:
+            if only_mod and s == (orig[idx] if idx < len(orig) else ''):
                 continue
-            if search and search not in s.lower() and search not in orig_s.lower():
+            if search and not self.search_index.match(bi, idx, search):
                 continue
-            shown += 1
-
-            row_bg = '#1c1600' if mod else '#1c1c1c'
-            row_border = '#5a3a00' if mod else '#242424'
-
-            row = tk.Frame(self.strings_frame, bg=row_bg,
-                           highlightthickness=1, highlightbackground=row_border,
-                           pady=3, padx=5)
-            row.pack(fill='x', pady=2, padx=6)
-
-            # Index
-            tk.Label(row, text=str(idx), bg=row_bg, fg='#444444',
-                     font=('Consolas', 9), width=4, anchor='e').pack(side='left', padx=(0, 4))
-
-            # Textarea
-            n_lines = max(1, (len(s) // 80) + s.count('\n') + 1)
-            ta = tk.Text(row, height=n_lines, bg='#131313', fg='#cccccc',
+            visible.append(idx)
+        self.visible_idx = visible
+
+        # O modelo pode ter sido trocado (reset/import): linhas não guardam nada.
+        for row in self.row_pool:
+            row.key = None
+        self.lbl_count.configure(text=f'{len(visible)} / {len(strings)} strings')
+        self._scroll_px = 0
+        self._layout_rows()
+
+    def _make_row(self):
+        row = _StringRow()
+        row.frame = tk.Frame(self.list_frame, bg='#1c1c1c',
+                             highlightthickness=1, highlightbackground='#242424',
+                             pady=3, padx=5)
+        row.lbl_idx = tk.Label(row.frame, text='', bg='#1c1c1c', fg='#444444',
+                               font=('Consolas', 9), width=4, anchor='e')
+        row.lbl_idx.pack(side='left', padx=(0, 4))
+        row.ta = tk.Text(row.frame, height=ROW_LINES, bg='#131313', fg='#cccccc',
                          insertbackground='#e8a020', relief='flat',
                          font=('Consolas', 10), wrap='word', padx=4, pady=3,
                          highlightthickness=1, highlightbackground='#2e2e2e',
                          highlightcolor='#e8a020')
-            ta.insert('1.0', s)
-            ta.pack(side='left', fill='x', expand=True)
-
-            # Bytes label
-            lbl_bytes = tk.Label(row, text=f'{len(s)}b', bg=row_bg,
+        row.ta.pack(side='left', fill='both', expand=True)
+        row.lbl_bytes = tk.Label(row.frame, text='', bg='#1c1c1c',
                                  fg='#444444', font=('Consolas', 9), width=6, anchor='e')
-            lbl_bytes.pack(side='left', padx=(4, 0))
-
-            # Bind para mudanças
-            def _on_change(event, _bi=self.cur_block, _idx=idx,
-                           _orig=orig_s, _ta=ta, _row=row,
-                           _lbl=lbl_bytes, _row_bg_orig=row_bg):
-                new_val = _ta.get('1.0', 'end-1c')
-                self.text_blocks[_bi][_idx] = new_val
-                _lbl.configure(text=f'{len(new_val)}b',
-                               fg='#e06060' if len(new_val) > 500 else '#444444')
-                is_mod = new_val != _orig
-                bg = '#1c1600' if is_mod else '#1c1c1c'
-                border = '#5a3a00' if is_mod else '#242424'
-                _row.configure(bg=bg, highlightbackground=border)
-
-            ta.bind('<KeyRelease>', _on_change)
-            ta.bind('<FocusOut>',   _on_change)
+        row.lbl_bytes.pack(side='left', padx=(4, 0))
+
+        row.ta.bind('<KeyRelease>', lambda e, r=row: self._on_row_change(r))
+        row.ta.bind('<FocusOut>',   lambda e, r=row: self._on_row_change(r))
+        for w in (row.frame, row.lbl_idx, row.ta, row.lbl_bytes):
+            self._bind_wheel(w)
+        return row
+
+    def _paint_row(self, row, value):
+        bi, idx = row.key
+        orig = self.orig_blocks.get(bi, [])
+        is_mod = value != (orig[idx] if idx < len(orig) else '')
+        bg = '#1c1600' if is_mod else '#1c1c1c'
+        row.frame.configure(bg=bg, highlightbackground='#5a3a00' if is_mod else '#242424')
+        row.lbl_idx.configure(bg=bg)
+        row.lbl_bytes.configure(text=f'{len(value)}b', bg=bg,
+                                fg='#e06060' if len(value) > 500 else '#444444')
+
+    def _bind_row(self, row, key):
+        """Associa uma linha reciclada à string (bloco, índice)."""
+        if row.key == key:
+            return
+        if row.key is not None:
+            self._on_row_change(row)    # não perder edição ainda não confirmada
+            if self.focus_get() is row.ta:
+                self.list_frame.focus_set()
+        row.key = key
+        value = self.text_blocks[key[0]][key[1]]
+        row.lbl_idx.configure(text=str(key[1]))
+        row.ta.delete('1.0', 'end')
+        row.ta.insert('1.0', value)
+        self._paint_row(row, value)
+
+    def _on_row_change(self, row):
+        if row.key is None:
+            return
+        bi, idx = row.key
+        new_val = row.ta.get('1.0', 'end-1c')
+        if new_val != self.text_blocks[bi][idx]:
+            self.dirty_blocks.add(bi)
+            self.search_index.update(bi, idx, new_val)
+        self.text_blocks[bi][idx] = new_val
+        self._paint_row(row, new_val)
+
+    def _layout_rows(self):
+        """Posiciona o pool de linhas sobre a janela visível da lista filtrada."""
+        height = max(self.list_frame.winfo_height(), 1)
+        total  = len(self.visible_idx) * ROW_H
+        self._scroll_px = max(0, min(self._scroll_px, total - height))
+
+        needed = height // ROW_H + 2
+        while len(self.row_pool) < needed:
+            self.row_pool.append(self._make_row())
+
+        first = self._scroll_px // ROW_H
+        shift = self._scroll_px % ROW_H
+        for k, row in enumerate(self.row_pool):
+            pos = first + k
+            if k < needed and pos < len(self.visible_idx):
+                self._bind_row(row, (self.cur_block, self.visible_idx[pos]))
+                row.frame.place(x=6, y=k * ROW_H - shift + 2, relwidth=1.0,
+                                width=-12, height=ROW_H - 4)
+            else:
+                row.frame.place_forget()
+
+        if total <= height:
+            self.str_scroll.set(0.0, 1.0)
+        else:
+            self.str_scroll.set(self._scroll_px / total,
+                                (self._scroll_px + height) / total)
+
+    def _scroll_to(self, px):
+        self._scroll_px = int(px)
+        self._layout_rows()
+
+    def _on_scrollbar(self, *args):
+        height = max(self.list_frame.winfo_height(), 1)
+        if args[0] == 'moveto':
+            self._scroll_to(float(args[1]) * len(self.visible_idx) * ROW_H)
+        elif args[0] == 'scroll':
+            step = height if args[2] == 'pages' else ROW_H // 2
+            self._scroll_to(self._scroll_px + int(args[1]) * step)
+
+    # ── Busca ────────────────────────────────────────────────────────────────
+    def _schedule_search(self):
+        """Debounce: só busca quando o usuário para de digitar."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        self.render_strings()
 
-            self.row_widgets.append((orig_s, ta, lbl_bytes))
+        query = self.search_index.fold(self.search_var.get())
+        if not (self.search_all.get() and query and self.loaded):
+            self._hits = []
+            self.results_frame.pack_forget()
+            return
 
-        self.lbl_count.configure(text=f'{shown} / {len(strings)} strings')
-        self.strings_canvas.yview_moveto(0)
+        self._hits = self.search_index.search(query)
+        self.lst_hits.delete(0, 'end')
+        for bi, idx in self._hits[:MAX_HITS]:
+            text = self.text_blocks[bi][idx].replace('\n', ' ')
+            self.lst_hits.insert('end', f'bloco {bi:<2} · #{idx:<4} {text[:90]}')
+        extra = len(self._hits) - MAX_HITS
+        if extra > 0:
+            self.lst_hits.insert('end', f'... mais {extra} resultados')
+        self.results_frame.pack(fill='x', before=self.str_scroll)
+        self.set_status(f'{len(self._hits)} resultados em {len(TEXT_BLOCKS)} blocos')
+
+    def _on_fold_toggle(self):
+        self.search_index.accents = self.fold_accents.get()
+        self.search_index.build(self.text_blocks, self.orig_blocks)
+        self._run_search()
+
+    def _jump_to_hit(self):
+        sel = self.lst_hits.curselection()
+        if not sel or sel[0] >= min(len(self._hits), MAX_HITS):
+            return
+        bi, idx = self._hits[sel[0]]
+        if bi != self.cur_block:
+            self._select_block(bi)
+        if idx not in self.visible_idx:   # ex.: escondida por 'só modificadas'
+            self.only_mod.set(False)
+            self.render_strings()
+        if idx not in self.visible_idx:   # editada desde a busca e não casa mais
+            return
+        self._scroll_to(self.visible_idx.index(idx) * ROW_H)
+        for row in self.row_pool:
+            if row.key == (bi, idx):
+                row.ta.focus_set()
+                break
+
+    def _bind_wheel(self, widget):
+        def wheel(event):
+            if getattr(event, 'num', None) == 4:
+                units = -1
+            elif getattr(event, 'num', None) == 5:
+                units = 1
+            else:
+                units = -1 * (event.delta // 120)
+            if isinstance(widget, tk.Text):
+                # String maior que ROW_LINES: a roda rola o próprio Text até a
+                # borda; só depois passa a rolar a lista.
+                first, last = widget.yview()
+                if (units < 0 and first > 0.0) or (units > 0 and last < 1.0) or units == 0:
+                    return None
+            self._scroll_to(self._scroll_px + units * (ROW_H // 2))
+            return 'break'
+        for seq in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            widget.bind(seq, wheel)
 
     # ── Drag & drop (TkinterDnD2 opcional) ───────────────────────────────────
     def _on_drop(self, event):
@@ -549,8 +1084,161 @@ class DevilHunterEditor(tk.Tk):
         if path.endswith('.dat'):
             self._load_dat(path)
 
+# ─── Benchmark dos perfis ─────────────────────────────────────────────────────
+def _peak_rss() -> int | None:
+    """Pico de memória residente do processo atual, em bytes (None se indisponível)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024   # Linux: KiB
+
+def _bench_profile(new_dec: bytes, profile: str) -> dict:
+    """Roda num processo novo, para que o pico de memória seja só deste perfil."""
+    base = _peak_rss()
+    t0 = time.perf_counter()
+    out = compress_dat(new_dec, profile=profile)
+    wall = time.perf_counter() - t0
+    peak = _peak_rss()
+    ok = decompress_dat(out) == new_dec
+    return {
+        'profile': profile,
+        'size': len(out),
+        'ratio': len(out) / max(len(new_dec), 1),
+        'wall': wall,
+        'peak': None if peak is None else peak - base,
+        'ok': ok,
+    }
+
+def benchmark_profiles(new_dec: bytes, profiles=None) -> list[dict]:
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for name in profiles or LZMA_PROFILES:
+        with ctx.Pool(1) as pool:
+            results.append(pool.apply(_bench_profile, (new_dec, name)))
+    return results
+
+def cmd_bench(args) -> int:
+    with open(args.dat, 'rb') as f:
+        raw_dec = decompress_dat(f.read())
+    offsets = read_offsets(raw_dec)
+    text_blocks = parse_text_blocks(raw_dec, offsets)
+    dirty = load_translation(args.json, text_blocks)[1] if args.json else set()
+    new_dec = rebuild(raw_dec, offsets, text_blocks, dirty)
+
+    print(f'Buffer reconstruído: {len(new_dec)} bytes')
+    print(f'{"perfil":<9} {"tamanho":>10} {"razão":>7} {"tempo":>9} {"pico mem":>10}')
+    for r in benchmark_profiles(new_dec, args.profiles):
+        peak = 'n/d' if r['peak'] is None else f'{r["peak"] / (1 << 20):.1f} MiB'
+        flag = '' if r['ok'] else '  ERRO: round-trip falhou'
+        print(f'{r["profile"]:<9} {r["size"]:>10} {r["ratio"]:>7.3f} '
+              f'{r["wall"]:>8.2f}s {peak:>10}{flag}')
+    return 0
+
+# ─── Build sem interface ──────────────────────────────────────────────────────
+def build_variant(raw_dec: bytes, offsets: list[int], json_path: str,
+                  out_path: str, profile: str = DEFAULT_PROFILE) -> tuple[int, set]:
+    """Aplica uma tradução sobre o .dat original e grava o .dat recomprimido."""
+    text_blocks = parse_text_blocks(raw_dec, offsets)
+    _, changed = load_translation(json_path, text_blocks)
+    out = compress_dat(rebuild(raw_dec, offsets, text_blocks, changed), profile=profile)
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(out)
+    return len(out), changed
+
+def variant_outputs(json_paths: list[str], out_dir: str, dat_name: str) -> dict:
+    """
+    Caminho de saída de cada variante: <out_dir>/<nome do json>/<dat_name>.
+    Se dois JSON têm o mesmo nome (a/tr.json, b/tr.json), usa o caminho relativo
+    à pasta comum (<out_dir>/a/tr/..., <out_dir>/b/tr/...). Saídas repetidas
+    ainda assim (ex.: o mesmo JSON duas vezes) são erro.
+    """
+    stems = [os.path.splitext(os.path.basename(j))[0] for j in json_paths]
+    if len(set(stems)) < len(stems):
+        full = [os.path.abspath(j) for j in json_paths]
+        base = os.path.commonpath([os.path.dirname(j) for j in full])
+        stems = [os.path.splitext(os.path.relpath(j, base))[0] for j in full]
+
+    jobs, seen = {}, {}
+    for j, stem in zip(json_paths, stems):
+        out = os.path.join(out_dir, stem, dat_name)
+        key = os.path.normcase(os.path.abspath(out))
+        if key in seen:
+            raise ValueError(f'{seen[key]} e {j} gerariam o mesmo arquivo: {out}')
+        seen[key] = j
+        jobs[j] = out
+    return jobs
+
+def cmd_build(args) -> int:
+    dat_name = os.path.basename(args.dat)
+    if args.output:
+        jobs = {args.json[0]: args.output}
+    else:
+        try:
+            jobs = variant_outputs(args.json, args.out_dir, dat_name)
+        except ValueError as e:
+            print(f'ERRO: {e}', file=sys.stderr)
+            return 2
+
+    with open(args.dat, 'rb') as f:
+        raw_dec = decompress_dat(f.read())
+    offsets = read_offsets(raw_dec)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(build_variant, raw_dec, offsets, j, out, args.profile): (j, out)
+                   for j, out in jobs.items()}
+        for fut in as_completed(futures):
+            j, out = futures[fut]
+            try:
+                size, changed = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f'ERRO {j}: {e}', file=sys.stderr)
+                continue
+            blocks = ', '.join(map(str, sorted(changed))) or 'nenhum'
+            print(f'{j} → {out} · {size} bytes · blocos alterados: {blocks}')
+    return 1 if failed else 0
+
+CLI_COMMANDS = ('bench', 'build')
+
+def cli(argv) -> int:
+    ap = argparse.ArgumentParser(description='Devil Hunter X — ferramentas de linha de comando')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+
+    p = sub.add_parser('bench', help='compara os perfis LZMA (razão, tempo, pico de memória)')
+    p.add_argument('dat', help='arquivo .dat original')
+    p.add_argument('--json', help='tradução (formato do Export JSON) aplicada antes')
+    p.add_argument('--profiles', nargs='+', choices=list(LZMA_PROFILES),
+                   help='perfis a medir (padrão: todos)')
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser('build', help='gera .dat traduzido(s) a partir de JSON (Export JSON)')
+    p.add_argument('dat', help='arquivo .dat original')
+    p.add_argument('json', nargs='+', help='uma tradução por variante de idioma')
+    p.add_argument('-o', '--output', help='arquivo de saída (só com um JSON)')
+    p.add_argument('--out-dir', default='build',
+                   help='pasta de saída: <out-dir>/<nome do json>/<nome do .dat>')
+    p.add_argument('--profile', default=DEFAULT_PROFILE, choices=list(LZMA_PROFILES))
+    p.add_argument('-j', '--jobs', type=int, default=None,
+                   help='processos em paralelo (padrão: nº de CPUs)')
+    p.set_defaults(func=cmd_build)
+
+    args = ap.parse_args(argv)
+    if args.cmd == 'build' and args.output and len(args.json) > 1:
+        ap.error('-o/--output só vale com um único JSON; use --out-dir')
+    return args.func(args)
+
+
 # ─── Main ─────────────────────────────────────────────────────────────────────
 if __name__ == '__main__':
+    # Só subcomandos conhecidos vão para a CLI; qualquer outro argumento (ex.:
+    # "Abrir com" do gerenciador de arquivos) é tratado como .dat a abrir na GUI
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS + ('-h', '--help'):
+        sys.exit(cli(sys.argv[1:]))
+
     # Tentar usar TkinterDnD2 para drag-and-drop real (opcional)
     try:
         from tkinterdnd2 import TkinterDnD
@@ -564,4 +1252,6 @@ if __name__ == '__main__':
     except ImportError:
         app = DevilHunterEditor()
 
+    if len(sys.argv) > 1 and os.path.isfile(sys.argv[1]):
+        app.after(0, lambda: app._load_dat(sys.argv[1]))
     app.mainloop()
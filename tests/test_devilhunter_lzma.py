@@ -0,0 +1,49 @@
+import importlib.util
+import lzma
+import os
+import struct
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+EDITOR = os.path.join(os.path.dirname(__file__), "..", "TOOLS", "devilhunter_editor_by_quakeman.py")
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("devilhunter_editor", EDITOR)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="module")
+def dh():
+    return load_module()
+
+
+def make_dec(dh):
+    # Header (0x19 + 25 offsets BE) seguido de blocos; os de texto no formato do jogo
+    blocks = [dh.build_block([f"texto {i}-{j}" for j in range(20)]) if i in dh.TEXT_BLOCKS
+              else bytes(range(256)) * 4 for i in range(dh.N_BLOCKS - 1)]
+    offs, cur = [], dh.HEADER_SIZE
+    for b in blocks:
+        offs.append(cur)
+        cur += len(b)
+    offs.append(cur)
+    return b"\x19" + struct.pack(">25I", *offs) + b"".join(blocks)
+
+
+def test_round_trip(dh):
+    dec = make_dec(dh)
+    assert dh.decompress_dat(dh.compress_dat(dec)) == dec
+
+
+def test_truncated_stream_raises(dh):
+    dat = dh.compress_dat(make_dec(dh))
+    with pytest.raises(lzma.LZMAError):
+        dh.decompress_dat(dat[:60])
+    with pytest.raises(lzma.LZMAError):
+        dh.decompress_dat(dat[:-8])
+    with pytest.raises(lzma.LZMAError):
+        dh.DatStream(dat[:60]).read_all()
@@ -0,0 +1,100 @@
+import importlib.util
+import os
+import struct
+
+import pytest
+
+pytest.importorskip("customtkinter")
+from tkinter import messagebox
+
+EDITOR = os.path.join(os.path.dirname(__file__), "..", "TOOLS", "Vivendi Text Editor (PACK files).py")
+TABLE_START = 0x10
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("vivendi_editor", EDITOR)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class Value:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, *args):
+        return self.value
+
+
+class Silent:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def make_pack(blocks):
+    # Cabeçalho + tabela (ptr + 2 + 2*i) + blocos (header, textos, terminador 0)
+    raw = [struct.pack(">I", 0xAABB0000 + i)
+           + b"".join(struct.pack(">H", len(t)) + t for t in texts) + b"\0\0"
+           for i, texts in enumerate(blocks)]
+    pos = TABLE_START + 2 * len(raw)
+    ptrs = []
+    for i, b in enumerate(raw):
+        ptrs.append(pos - (2 + 2 * i))
+        pos += len(b)
+    data = b"HDR!" * 4 + b"".join(struct.pack(">H", p) for p in ptrs)
+    return data + b"".join(raw)
+
+
+@pytest.fixture
+def editor(monkeypatch):
+    for name in ("showinfo", "showwarning", "showerror"):
+        monkeypatch.setattr(messagebox, name, lambda *a, **k: None)
+    mod = load_module()
+
+    def make(data):
+        e = object.__new__(mod.GameTextEditor)
+        e.file_data = data
+        e.text_buffer = mod.PieceTable(data)
+        e.blocks, e.pointers = [], []
+        e.current_block = e.current_text = None
+        e.current_encoding = "Latin-1"
+        e.entry_table_start = Value(hex(TABLE_START))
+        e.entry_num_blocks = Value("3")
+        e.combo_blocks = e.text_listbox = e.lbl_status = e.lbl_counter = Silent()
+        e.load_texts()
+        return e
+    return make
+
+
+def edit(e, block, idx, text):
+    e.current_block = e.blocks[block]
+    e.current_text = e.current_block.texts[idx]
+    e.text_editor = Value(text)
+    e.apply_changes()
+
+
+def texts(e):
+    return [[t.text for t in b.texts] for b in e.blocks]
+
+
+BLOCKS = [[b"HELLO", b"world"], [b"second"], [b"third", b"block"]]
+
+
+def test_reload_after_unsaved_edit_keeps_blocks(editor):
+    e = editor(make_pack(BLOCKS))
+    edit(e, 0, 0, "HELLO, a much longer line")
+    e.load_texts()
+    assert texts(e) == [["HELLO, a much longer line", "world"], ["second"], ["third", "block"]]
+
+
+def test_edit_back_to_original_length_restores_pointers(editor):
+    data = make_pack(BLOCKS)
+    e = editor(data)
+    edit(e, 0, 0, "HELLO, a much longer line")
+    assert e.rebuild_pointers() == []
+    e.text_buffer.materialize()
+    edit(e, 0, 0, "HELLO")
+    assert e.rebuild_pointers() == []
+    assert e.text_buffer.materialize() == data
+    e.load_texts()
+    assert texts(e) == [["HELLO", "world"], ["second"], ["third", "block"]]